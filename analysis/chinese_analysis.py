@@ -1,14 +1,17 @@
 from utils.common_fun import *
+from utils.metrics import default_registry as metrics
 import jieba
 
 
 if __name__ == "__main__":
     directory = "chinese_data"  
-    texts = read_multiple_txt_files(directory)
+    with metrics.stage("read"):
+        texts = read_multiple_txt_files(directory)
     
     # 合并所有文本并进行清洗
-    original_text = "".join(texts)
-    cleaned_text = clean_text_chinese(original_text)
+    with metrics.stage("clean"):
+        original_text = "".join(texts)
+        cleaned_text = clean_text_chinese(original_text)
     
     # 统计文本规模
     original_length, cleaned_length = report_text_statistics(original_text, cleaned_text)
@@ -17,17 +20,31 @@ if __name__ == "__main__":
     scale_intervals = list(range(10000000, cleaned_length, 2000000))
     
     # 计算熵随文本规模的变化
-    entropy_results = calculate_entropy_by_scale(cleaned_text, scale_intervals)
-    
-    # 使用jieba分词后，验证齐夫定律（以词为单位）
-    tokenized_words = tokenize_and_count_words(cleaned_text)
-    zipf_results = calculate_zipf_law(tokenized_words)
-    
-    # 绘制熵随文本规模变化图
-    plot_entropy_variation(entropy_results, "Chinese", "chinese_entropy_variation.png")
-    
-    # 绘制齐夫定律图
-    plot_zipf_law(zipf_results, "Chinese", "chinese_zipf_law.png")
+    with metrics.stage("entropy"):
+        entropy_results = calculate_entropy_by_scale(cleaned_text, scale_intervals)
+
+    # 计算1..6阶n元块熵与条件熵随文本规模的变化
+    with metrics.stage("ngram_entropy"):
+        ngram_results = calculate_ngram_entropy_by_scale(cleaned_text, scale_intervals, max_order=6)
+    block_entropy_results, conditional_entropy_results = split_ngram_results(ngram_results)
+    
+    # 使用jieba逐词分词，单次遍历统计词频（齐夫定律）与词汇增长（Heaps定律）
+    with metrics.stage("tokenize_count"):
+        word_counts, heaps_results = calculate_token_statistics(iter_words_chinese(cleaned_text))
+        zipf_results = calculate_zipf_law_from_counts(word_counts)
+    
+    with metrics.stage("plot"):
+        # 绘制熵随文本规模变化图
+        plot_entropy_variation(entropy_results, "Chinese", "chinese_entropy_variation.png")
+        plot_entropy_variation(block_entropy_results, "Chinese, block entropy", "chinese_block_entropy.png")
+        plot_entropy_variation(conditional_entropy_results, "Chinese, conditional entropy", "chinese_conditional_entropy.png")
+    
+        # 绘制齐夫定律图
+        plot_zipf_law(zipf_results, "Chinese", "chinese_zipf_law.png")
+
+        # 绘制Heaps定律图
+        plot_heaps_law(heaps_results, "Chinese", "chinese_heaps_law.png")
     
     # 保存结果
-    save_results(entropy_results, zipf_results, "chinese_analysis_results.txt")
+    save_results(entropy_results, zipf_results, "chinese_analysis_results.txt", ngram_results, heaps_results)
+    metrics.dump("chinese_analysis_metrics.json")
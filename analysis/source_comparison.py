@@ -0,0 +1,30 @@
+import sys
+from utils.map_reduce import *
+from utils.metrics import default_registry as metrics
+
+
+if __name__ == "__main__":
+    # 可选参数：chinese 或 english，默认两者都分析
+    corpora = {"chinese": ("chinese_data", "Chinese"), "english": ("english_data", "English")}
+    languages = sys.argv[1:] or list(corpora)
+
+    for language in languages:
+        directory, title = corpora[language]
+
+        # 每个来源子目录的文件并行统计后合并
+        with metrics.stage(f"{language}_map_reduce"):
+            source_aggregates, global_aggregate = analyze_sources(directory, language)
+        source_summaries = {source: summarize_aggregate(aggregate) for source, aggregate in source_aggregates.items()}
+        global_summary = summarize_aggregate(global_aggregate)
+
+        for source, summary in dict(source_summaries, all=global_summary).items():
+            print(f"{source}: 熵 {summary['entropy']:.4f}, 词数 {summary['tokens']}, "
+                  f"词汇量 {summary['vocabulary']}, 齐夫指数 {summary['zipf_exponent']:.4f}")
+
+        # 绘制对比图并保存报告
+        with metrics.stage(f"{language}_plot"):
+            plot_source_entropy(source_summaries, title, f"{language}_source_entropy.png")
+            plot_source_zipf_law(source_summaries, global_summary, title, f"{language}_source_zipf_law.png")
+        save_comparison_report(source_summaries, global_summary, f"{language}_source_comparison.txt")
+
+    metrics.dump("source_comparison_metrics.json")
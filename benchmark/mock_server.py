@@ -0,0 +1,260 @@
+import json
+import time
+import zlib
+import random
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# frequent Chinese characters and English words used to build synthetic text
+CHINESE_CHARS = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处队南给色光门即保治北造百规热领七海口东导器压志世金增争济阶油思术极交受联什认六共权收证改清己美再采转更单风切打白教速花带安场身车例真务具万每目至达走积示议声报斗完类八离华名确才科张信马节话米整空元况今集温传土许步群广石记需段研界拉林律叫且究观越织装影算低持音众书布复容儿须际商非验连断深难近矿千周委素技备半办青省列习响约支般史感劳便团往酸历市克何除消构府称太准精值号率族维划选标写存候毛亲快效斯院查江型眼王按格养易置派层片始却专状育厂京识适属圆包火住调满县局照参红细引听该铁价严"
+ENGLISH_WORDS = (
+    "the of and to in a is that for it as was with be by on not he i this are or his from at which "
+    "but have an they you were her she there been one all we their has would when if so no what up "
+    "out who said more will about its time can into my them could than some other people only new "
+    "years world china government economy market development report city country year state data "
+    "policy trade growth international company chinese president global national public officials"
+).split()
+
+SIZE_UNITS = {'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+def parse_size(size):
+    """Parse sizes such as '1MB' or '512KB' into bytes"""
+    size = size.strip().upper()
+    for unit, factor in SIZE_UNITS.items():
+        if size.endswith(unit):
+            return int(float(size[:-len(unit)]) * factor)
+    return int(size)
+
+
+def chinese_paragraph(rng, length):
+    """Chinese text whose character frequencies roughly follow Zipf's law"""
+    weights = [1 / (i + 1) for i in range(len(CHINESE_CHARS))]
+    text = ''.join(rng.choices(CHINESE_CHARS, weights=weights, k=length))
+    return text + "。"
+
+
+def english_paragraph(rng, length):
+    """English text of about `length` characters with Zipf-like word frequencies"""
+    weights = [1 / (i + 1) for i in range(len(ENGLISH_WORDS))]
+    words = rng.choices(ENGLISH_WORDS, weights=weights, k=max(1, length // 5))
+    return ' '.join(words).capitalize() + "."
+
+
+def synthetic_corpus(language, size, seed=0, pool_size=256, paragraph_size=2000):
+    """Build a corpus of about `size` UTF-8 bytes from a pool of random paragraphs"""
+    rng = random.Random(seed)
+    make_paragraph = chinese_paragraph if language == 'chinese' else english_paragraph
+    pool = [make_paragraph(rng, paragraph_size) + "\n" for _ in range(pool_size)]
+    pool_bytes = [len(p.encode('utf-8')) for p in pool]
+    parts = []
+    total = 0
+    while total < size:
+        i = rng.randrange(pool_size)
+        parts.append(pool[i])
+        total += pool_bytes[i]
+    return ''.join(parts)
+
+
+class MockNewsServer:
+    """Local HTTP server replaying pages shaped like each crawled site
+
+    Every site lives under its own prefix, e.g. `url('/sina/society/')` is the
+    Sina list page. `latency` (plus up to `jitter`) seconds are slept before
+    each response; `paragraphs` x `paragraph_size` controls the article size.
+    A share `error_rate` of the requests fails with 503 to exercise retries.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, articles_per_page=10,
+                 list_pages=3, paragraphs=10, paragraph_size=200, book_count=5, book_sections=100, book_parts=1,
+                 error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.articles_per_page = articles_per_page
+        self.list_pages = list_pages
+        self.paragraphs = paragraphs
+        self.paragraph_size = paragraph_size
+        self.book_count = book_count
+        self.book_sections = book_sections
+        self.book_parts = book_parts
+        self.error_rate = error_rate
+        self.seed = seed
+
+        # pre-generated paragraphs so serving stays cheap compared to the crawlers
+        rng = random.Random(seed)
+        self.chinese_pool = [chinese_paragraph(rng, paragraph_size) for _ in range(64)]
+        self.english_pool = [english_paragraph(rng, paragraph_size) for _ in range(64)]
+
+        self.routes = [
+            ('/sina/', self.sina),
+            ('/infzm/', self.infzm),
+            ('/chinadaily/', self.china_daily),
+            ('/anylang/', self.anylang),
+            ('/globaltimes/', self.global_times),
+            ('/thepaper/', self.the_paper),
+        ]
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path):
+        return self.base_url + path
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def handle(self, request):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+        parsed = urlparse(request.path)
+        body, content_type = None, 'text/html; charset=utf-8'
+        status = 200
+        if self.error_rate and random.random() < self.error_rate:
+            body, status = 'Service Unavailable', 503
+        else:
+            for prefix, route in self.routes:
+                if parsed.path.startswith(prefix):
+                    body = route(parsed.path[len(prefix) - 1:], parse_qs(parsed.query))
+                    break
+        if isinstance(body, dict):
+            body, content_type = json.dumps(body, ensure_ascii=False), 'application/json; charset=utf-8'
+        if body is None:
+            body, status = 'Not Found', 404
+        data = body.encode('utf-8')
+        request.send_response(status)
+        request.send_header('Content-Type', content_type)
+        request.send_header('Content-Length', str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    def _paragraphs(self, pool, key):
+        start = zlib.crc32(repr((self.seed, key)).encode()) % len(pool)
+        return [pool[(start + i) % len(pool)] for i in range(self.paragraphs)]
+
+    @staticmethod
+    def _number(path):
+        digits = ''.join(ch for ch in path.rsplit('/', 1)[-1] if ch.isdigit())
+        return int(digits) if digits else None
+
+    # Sina: /society/ list with ul.seo_data_list, articles under /doc/
+    def sina(self, path, query):
+        if path == '/society/':
+            items = ''.join(f'<li><a href="{self.url(f"/sina/doc/{i}.shtml")}">新浪新闻{i}</a></li>'
+                            for i in range(self.articles_per_page * self.list_pages))
+            return f'<html><body><ul class="seo_data_list">{items}</ul></body></html>'
+        if path.startswith('/doc/'):
+            paragraphs = ''.join(f'<p>{p}</p>' for p in self._paragraphs(self.chinese_pool, path))
+            return ('<html><body><div class="date-source"><span>2024年01月01日</span><a>新浪网</a></div>'
+                    f'<div class="article">{paragraphs}</div></body></html>')
+        return None
+
+    # Southern Weekly: JSON lists at /contents?term_id=&page=, HTML articles at /contents/<id>
+    def infzm(self, path, query):
+        if path == '/contents':
+            term_id = int(query.get('term_id', ['0'])[0])
+            page = int(query.get('page', ['1'])[0])
+            contents = []
+            if page <= self.list_pages:
+                first = (term_id * self.list_pages + page - 1) * self.articles_per_page
+                contents = [{'id': i, 'subject': f'南方周末{i}'} for i in range(first, first + self.articles_per_page)]
+            return {'code': 200, 'data': {'contents': contents}}
+        if path.startswith('/contents/'):
+            paragraphs = self._paragraphs(self.chinese_pool, path)
+            fulltext = ''.join(f'<p>{p}</p>' for p in paragraphs[1:])
+            return ('<html><body><div class="nfzm-content__content">'
+                    f'<blockquote class="nfzm-bq">{paragraphs[0]}</blockquote>'
+                    f'<div class="nfzm-content__fulltext">{fulltext}</div></div></body></html>')
+        return None
+
+    # China Daily: /cndy/YYYY-MM/DD/index1.html linking to content_<n>.htm
+    def china_daily(self, path, query):
+        if path.endswith('/index1.html'):
+            links = ''.join(f'<a href="content_{i}.htm">China Daily {i}</a>' for i in range(self.articles_per_page))
+            return f'<html><body>{links}</body></html>'
+        if '/content_' in path:
+            paragraphs = ''.join(f'<p>{p}</p>' for p in self._paragraphs(self.english_pool, path))
+            return (f'<html><body><div class="lft_art"><h1>China Daily {self._number(path)}</h1></div>'
+                    f'<div id="Content">{paragraphs}</div></body></html>')
+        return None
+
+    # anylang: book list at /en/books/en, books at /en/book/<id>/read split into ?page= parts
+    def anylang(self, path, query):
+        if path == '/en/books/en':
+            return '<html><body>' + ''.join(
+                f'<span class="field-content"><a href="{url}">Book</a></span>' for url in self.book_paths()
+            ) + '</body></html>'
+        if path.startswith('/en/book/') and path.endswith('/read'):
+            part = int(query.get('page', ['0'])[0])
+            if part >= self.book_parts:
+                return None
+            first = part * self.book_sections + 1
+            sections = ''.join(
+                f'<div class="page n{i}">' + ''.join(f'<p>{p}</p>' for p in self._paragraphs(self.english_pool, (path, i))) + '</div>'
+                for i in range(first, first + self.book_sections)
+            )
+            pager = ''.join(f'<li><a href="{path}?page={i}">{i + 1}</a></li>' for i in range(1, self.book_parts))
+            return f'<html><body>{sections}<ul class="pager">{pager}</ul></body></html>'
+        return None
+
+    def book_paths(self):
+        return [f'/en/book/{i}/read' for i in range(self.book_count)]
+
+    # Global Times: column list at /china/<column>, article pages with <br> separated text
+    def global_times(self, path, query):
+        if path.startswith('/china/'):
+            column = path.rsplit('/', 1)[-1]
+            items = ''.join(
+                f'<div class="list_info"><a href="{self.url(f"/globaltimes/content/{column}{i}.shtml")}">Global Times {i}</a></div>'
+                for i in range(self.articles_per_page)
+            )
+            return f'<html><body><div class="level01_list">{items}</div></body></html>'
+        if path.startswith('/content/'):
+            text = ''.join(f'<br>{p}' for p in self._paragraphs(self.english_pool, path))
+            return ('<html><body><div class="article_page"><div class="article_content">'
+                    f'<div class="article_right">{text}<br></div></div></div></body></html>')
+        return None
+
+    # ThePaper: homepage with div.news_li entries, articles laid out for the crawler's XPaths
+    def the_paper(self, path, query):
+        if path == '/':
+            items = ''.join(f'<div class="news_li"><h2><a href="{self.url(f"/thepaper/newsDetail_forward_{i}")}">澎湃新闻{i}</a></h2></div>'
+                            for i in range(self.articles_per_page * self.list_pages))
+            return f'<html><body>{items}</body></html>'
+        if path.startswith('/newsDetail_forward_'):
+            paragraphs = ''.join(f'<p>{p}</p>' for p in self._paragraphs(self.chinese_pool, path))
+            return ('<html><body><main><div></div><div></div><div></div><div><div><div><div>'
+                    f'<h1>澎湃新闻{self._number(path)}</h1><div></div><div>{paragraphs}</div>'
+                    '</div></div></div></div></main></body></html>')
+        return None
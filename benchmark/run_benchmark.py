@@ -0,0 +1,253 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+"""Offline benchmarks for the crawlers and the analysis functions
+
+Crawlers are run end to end against `MockNewsServer`, analysis functions over
+synthetic corpora. Examples:
+
+    python -m benchmark.run_benchmark crawl --latency 0.01
+    python -m benchmark.run_benchmark analysis --sizes 1MB,10MB,100MB,1GB
+    python -m benchmark.run_benchmark all --output bench.json --baseline last_bench.json
+"""
+
+import os
+import sys
+import json
+import math
+import logging
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import MetricsRegistry
+from benchmark.mock_server import MockNewsServer, synthetic_corpus, parse_size
+
+logger = logging.getLogger(__name__)
+
+
+def bench_sina(server, registry, args):
+    from crawler.xinlang_crawler import SinaCrawler
+    SinaCrawler(metrics=registry, base_url=server.url('/sina/society/'))
+
+
+def bench_southern_weekly(server, registry, args):
+    from crawler.southern_weekly_crawler import InfzmCrawler
+    InfzmCrawler(term_ids=[1, 2, 3], metrics=registry, base_url=server.url('/infzm/contents'))
+
+
+def bench_china_daily(server, registry, args):
+    from crawler.china_daily_crawler import ChinaDailyCrawler
+    ChinaDailyCrawler(args.year, args.year, metrics=registry, base_url=server.url('/chinadaily/cndy/'))
+
+
+def bench_books(server, registry, args):
+    from crawler.book_crawler import EnglishBookCrawler
+    crawler = EnglishBookCrawler(base_url=server.url('/anylang'), output_dir='./english_data/books/', metrics=registry)
+    # the book list needs a browser, so feed the book pages directly like crawl_books does
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        list(executor.map(crawler.fetch_book_content, server.book_paths()))
+    crawler.metrics.close()
+
+
+def bench_global_times(server, registry, args):
+    from crawler.global_times_crawler import GlobalTimesCrawler
+    GlobalTimesCrawler(url=server.url('/globaltimes/china'), columns=['military', 'science'],
+                       save_path='english_data/Global_Times_new', max_pages=1, wait_time=0,
+                       metrics=registry, driver_path=args.driver_path)
+
+
+def bench_the_paper(server, registry, args):
+    from crawler.the_paper_crawler import ThePaperCrawler
+    crawler = ThePaperCrawler(driver_path=args.driver_path, output_dir='./chinese_data/Thepaper/', metrics=registry)
+    crawler.crawl(root_url=server.url('/thepaper/'))
+
+
+CRAWLER_BENCHMARKS = {
+    'sina': bench_sina,
+    'southern_weekly': bench_southern_weekly,
+    'china_daily': bench_china_daily,
+    'books': bench_books,
+    'global_times': bench_global_times,
+    'the_paper': bench_the_paper,
+}
+# these crawlers drive a real browser and only run when --driver-path is given
+WEBDRIVER_BENCHMARKS = {'global_times', 'the_paper'}
+
+
+def merged_histogram(registry, name):
+    """Merge the per-source histograms called `name` into one"""
+    merged = None
+    for (hist_name, _), histogram in registry.histograms.items():
+        if hist_name != name:
+            continue
+        if merged is None:
+            merged = type(histogram)(histogram.buckets)
+        for i, count in enumerate(histogram.counts):
+            merged.counts[i] += count
+        merged.count += histogram.count
+        merged.sum += histogram.sum
+        merged.min = histogram.min if merged.min is None else min(merged.min, histogram.min)
+        merged.max = histogram.max if merged.max is None else max(merged.max, histogram.max)
+    return merged
+
+
+def run_crawler_benchmarks(args):
+    results = {}
+    names = args.crawlers.split(',') if args.crawlers else list(CRAWLER_BENCHMARKS)
+    server = MockNewsServer(latency=args.latency, jitter=args.jitter, articles_per_page=args.articles,
+                            paragraphs=args.paragraphs, paragraph_size=args.paragraph_size,
+                            book_count=args.books, book_sections=args.book_sections, book_parts=args.book_parts)
+    cwd = os.getcwd()
+    with server, tempfile.TemporaryDirectory() as work_dir:
+        # crawlers write to relative paths, keep their output out of the repository
+        os.chdir(work_dir)
+        try:
+            for name in names:
+                if name in WEBDRIVER_BENCHMARKS and not args.driver_path:
+                    logger.info(f"Skipping {name}: needs --driver-path")
+                    continue
+                registry = MetricsRegistry(summary_interval=math.inf)
+                CRAWLER_BENCHMARKS[name](server, registry, args)
+                rates = registry.rates()
+                fetch = merged_histogram(registry, 'fetch_seconds')
+                errors = sum(v for (metric, _), v in registry.counters.items() if metric == 'errors_total')
+                results[name] = {
+                    'elapsed': rates['elapsed'],
+                    'pages': fetch.count if fetch else 0,
+                    'pages_per_second': rates['pages_per_second'],
+                    'bytes_per_second': rates['bytes_per_second'],
+                    'p50_latency': fetch.quantile(0.5) if fetch else 0.0,
+                    'p99_latency': fetch.quantile(0.99) if fetch else 0.0,
+                    'errors': errors,
+                }
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def run_analysis_benchmarks(args):
+    from utils.common_fun import (clean_text_chinese, clean_text_english, calculate_entropy_by_scale,
+                                  calculate_ngram_entropy_by_scale, tokenize_and_count_words, calculate_zipf_law,
+                                  calculate_zipf_law_from_counts, calculate_token_statistics, iter_words_chinese,
+                                  iter_words_english)
+
+    registry = MetricsRegistry(summary_interval=math.inf, trace_memory=args.trace_memory)
+    list_max_size = parse_size(args.list_max_size)
+    results = {}
+    for language in args.languages.split(','):
+        for size_name in args.sizes.split(','):
+            size = parse_size(size_name)
+            key = f"{language}_{size_name}"
+            logger.info(f"Generating {size_name} {language} corpus")
+            text = synthetic_corpus(language, size, seed=args.seed)
+            text = clean_text_chinese(text) if language == 'chinese' else clean_text_english(text)
+            # ten evenly spaced checkpoints like the scale_intervals of the analysis scripts
+            scale_intervals = list(range(len(text) // 10, len(text) + 1, max(1, len(text) // 10)))
+
+            with registry.stage(f"{key}/calculate_entropy_by_scale"):
+                calculate_entropy_by_scale(text, scale_intervals)
+            with registry.stage(f"{key}/calculate_ngram_entropy_by_scale"):
+                calculate_ngram_entropy_by_scale(text, scale_intervals, max_order=6)
+            with registry.stage(f"{key}/calculate_token_statistics"):
+                word_counts, heaps_results = calculate_token_statistics(
+                    iter_words_chinese(text) if language == 'chinese' else iter_words_english(text))
+            with registry.stage(f"{key}/calculate_zipf_law"):
+                calculate_zipf_law_from_counts(word_counts)
+            del word_counts
+            # the list-based pipeline holds every token in memory (about 1.5 GiB per 10MB of Chinese)
+            if size <= list_max_size:
+                with registry.stage(f"{key}/tokenize_list"):
+                    words = tokenize_and_count_words(text) if language == 'chinese' else text.split()
+                with registry.stage(f"{key}/calculate_zipf_law_list"):
+                    calculate_zipf_law(words)
+                del words
+            del text
+
+            for stage_name, stage in registry.stages.items():
+                if stage_name.startswith(key + '/'):
+                    results[stage_name] = dict(stage, mb_per_second=size / 1024 / 1024 / max(stage['wall_time'], 1e-9))
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Return the benchmarks that got slower than `tolerance` allows"""
+    regressions = []
+    for name, crawl in results.get('crawl', {}).items():
+        old = baseline.get('crawl', {}).get(name)
+        if old and crawl['pages_per_second'] < old['pages_per_second'] * (1 - tolerance):
+            regressions.append(f"crawl {name}: {crawl['pages_per_second']:.1f} < {old['pages_per_second']:.1f} pages/s")
+    for name, stage in results.get('analysis', {}).items():
+        old = baseline.get('analysis', {}).get(name)
+        if old and stage['wall_time'] > old['wall_time'] * (1 + tolerance):
+            regressions.append(f"analysis {name}: {stage['wall_time']:.2f}s > {old['wall_time']:.2f}s")
+    return regressions
+
+
+def print_report(results):
+    if results.get('crawl'):
+        print(f"{'crawler':<18}{'pages':>8}{'pages/s':>10}{'KiB/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for name, r in results['crawl'].items():
+            print(f"{name:<18}{r['pages']:>8}{r['pages_per_second']:>10.1f}{r['bytes_per_second'] / 1024:>10.1f}"
+                  f"{r['p50_latency'] * 1000:>10.2f}{r['p99_latency'] * 1000:>10.2f}{r['errors']:>8}")
+    if results.get('analysis'):
+        print(f"{'analysis':<48}{'seconds':>10}{'MB/s':>12}{'RSS MiB':>10}{'traced MiB':>12}")
+        for name, r in results['analysis'].items():
+            rss, growth, peak = (f"{r[key] / 1024 / 1024:.1f}" if r.get(key) is not None else None
+                                 for key in ('peak_rss_bytes', 'peak_rss_growth_bytes', 'peak_memory_bytes'))
+            # without a per-stage peak (non-Linux) show how far the stage raised the process peak
+            rss = rss or (f"+{growth}" if growth else '-')
+            peak = peak or '-'
+            print(f"{name:<48}{r['wall_time']:>10.2f}{r['mb_per_second']:>12.2f}{rss:>10}{peak:>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('suite', choices=['crawl', 'analysis', 'all'])
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown against the baseline")
+
+    crawl = parser.add_argument_group('crawl')
+    crawl.add_argument('--crawlers', help=f"comma separated subset of {','.join(CRAWLER_BENCHMARKS)}")
+    crawl.add_argument('--latency', type=float, default=0.0, help="seconds the mock server waits per response")
+    crawl.add_argument('--jitter', type=float, default=0.0, help="extra random latency of up to this many seconds")
+    crawl.add_argument('--articles', type=int, default=10, help="articles per list page")
+    crawl.add_argument('--paragraphs', type=int, default=10, help="paragraphs per article")
+    crawl.add_argument('--paragraph-size', type=int, default=200, help="characters per paragraph")
+    crawl.add_argument('--books', type=int, default=5)
+    crawl.add_argument('--book-sections', type=int, default=100, help="sections per book part")
+    crawl.add_argument('--book-parts', type=int, default=1, help="pages a book is split into")
+    crawl.add_argument('--year', type=int, default=2024, help="year replayed for China Daily")
+    crawl.add_argument('--driver-path', help="Edge driver, enables the Global Times and ThePaper benchmarks")
+
+    analysis = parser.add_argument_group('analysis')
+    analysis.add_argument('--sizes', default='1MB,10MB,100MB', help="corpus sizes, up to e.g. 1GB")
+    analysis.add_argument('--languages', default='chinese,english')
+    analysis.add_argument('--seed', type=int, default=0)
+    analysis.add_argument('--list-max-size', default='1MB',
+                          help="largest corpus for the list-based tokenize and Zipf stages, which keep every token")
+    analysis.add_argument('--trace-memory', action='store_true', help="record the peak memory of each stage with tracemalloc (slows the run down)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    results = {}
+    if args.suite in ('crawl', 'all'):
+        results['crawl'] = run_crawler_benchmarks(args)
+    if args.suite in ('analysis', 'all'):
+        results['analysis'] = run_analysis_benchmarks(args)
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare_with_baseline(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,64 +4,152 @@
 import os
 import re
 import time
+import shutil
 import logging
 import requests
+from lxml import etree
 from bs4 import BeautifulSoup
 from selenium import webdriver
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 from concurrent.futures import ThreadPoolExecutor
+from utils.metrics import CrawlMetrics
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger()
 
 DRIVER_PATH = "D:\\edge\\edgedriver_win64\\msedgedriver.exe"
 
+# sections of a book page and the pager links of paginated books
+SECTION_CLASS = re.compile('page n.*')
+PAGE_LINK = re.compile(r'[?&]page=(\d+)')
+CHUNK_SIZE = 64 * 1024
+
 class EnglishBookCrawler:
-    def __init__(self, base_url, output_dir, driver_path=DRIVER_PATH):
+    def __init__(self, base_url, output_dir, driver_path=DRIVER_PATH, metrics=None, part_workers=3):
         self.base_url = base_url
         self.output_dir = output_dir
         self.driver_path = driver_path
+        self.part_workers = part_workers
+        self.metrics = CrawlMetrics("books", metrics)
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
 
-    def setup_webdriver(self, url):
-        """Set up WebDriver to get the page"""
+    def setup_webdriver(self, url, max_scrolls=5, scroll_timeout=5):
+        """Set up WebDriver to get the page, scrolling until no more books load"""
         logger.info(f"Starting WebDriver to get the page: {url}")
         driver = webdriver.Edge(executable_path=self.driver_path)
         driver.get(url)
-        for _ in range(5):
+        last_height = driver.execute_script("return document.body.scrollHeight")
+        for _ in range(max_scrolls):
             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(5)
+            try:
+                # continue as soon as the page grows instead of sleeping a fixed time
+                WebDriverWait(driver, scroll_timeout).until(
+                    lambda d: d.execute_script("return document.body.scrollHeight") > last_height)
+            except TimeoutException:
+                break
+            last_height = driver.execute_script("return document.body.scrollHeight")
         return driver
 
-    def save_to_txt(self, data_list, file_name):
-        """Save the data to a text file"""
-        output_path = os.path.join(self.output_dir, f"{file_name}.txt")
-        with open(output_path, 'w', encoding='utf-8') as f:
-            for item in data_list:
-                f.write(item['text'] + "\n")
-        logger.info(f"Data successfully saved to: {output_path}")
+    def write_sections(self, parser, f):
+        """Write the sections parsed so far and drop them from the tree
+
+        Returns the highest pager page number seen (0 if none)."""
+        last_page = 0
+        for _, element in parser.read_events():
+            if element.tag == 'a':
+                match = PAGE_LINK.search(element.get('href', ''))
+                if match:
+                    last_page = max(last_page, int(match.group(1)))
+            elif element.tag == 'div' and SECTION_CLASS.search(element.get('class', '')):
+                section_text = ''.join(text for text in (p.xpath('string()').strip() for p in element.iter('p')) if text)
+                if section_text:
+                    f.write(section_text + "\n")
+                # free the section and everything before it so memory stays flat
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+        return last_page
+
+    def stream_sections(self, url, f):
+        """Download a book page and write its sections to `f` while it is being parsed
+
+        Downloading and parsing alternate chunk by chunk; their times are summed
+        into one fetch and one parse observation like the other crawlers."""
+        parser = etree.HTMLPullParser(events=('end',), encoding='utf-8')
+        size = 0
+        last_page = 0
+        fetch_time = parse_time = 0.0
+        start = time.perf_counter()
+        try:
+            with requests.get(url, stream=True) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    fetched = time.perf_counter()
+                    fetch_time += fetched - start
+                    size += len(chunk)
+                    parser.feed(chunk)
+                    last_page = max(last_page, self.write_sections(parser, f))
+                    start = time.perf_counter()
+                    parse_time += start - fetched
+            fetched = time.perf_counter()
+            fetch_time += fetched - start
+            parser.close()
+            last_page = max(last_page, self.write_sections(parser, f))
+            parse_time += time.perf_counter() - fetched
+        finally:
+            self.metrics.observe("fetch", fetch_time)
+            self.metrics.observe("parse", parse_time)
+        self.metrics.page(size)
+        return last_page
+
+    def fetch_book_parts(self, book_url, output_path, last_page):
+        """Fetch pages 1..last_page of a paginated book concurrently and append them in order"""
+        pages = range(1, last_page + 1)
+        part_paths = [f"{output_path}.part{page}" for page in pages]
+
+        def fetch_part(page, part_path):
+            with open(part_path, 'w', encoding='utf-8') as f:
+                self.stream_sections(f"{self.base_url}{book_url}?page={page}", f)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.part_workers) as executor:
+                list(executor.map(fetch_part, pages, part_paths))
+            with self.metrics.timer("write"), open(output_path, 'a', encoding='utf-8') as out:
+                for part_path in part_paths:
+                    with open(part_path, 'r', encoding='utf-8') as f:
+                        shutil.copyfileobj(f, out)
+        finally:
+            for part_path in part_paths:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
 
     def fetch_book_content(self, book_url):
         """Obtain the content of a book"""
         if not book_url.endswith('read'):
             return
         book_id = book_url.split('/')[-2]
+        output_path = os.path.join(self.output_dir, f"{book_id}.txt")
         logger.info(f"Starting to crawl book content: {book_id}")
         try:
-            book_page = requests.get(self.base_url + book_url).content.decode()
+            with open(output_path, 'w', encoding='utf-8') as f:
+                last_page = self.stream_sections(self.base_url + book_url, f)
+            if last_page:
+                self.fetch_book_parts(book_url, output_path, last_page)
         except requests.RequestException as e:
+            self.metrics.error("fetch")
             logger.error(f"Failed to fetch book: {book_url} - {e}")
+            os.remove(output_path)
+            return
+        except etree.LxmlError as e:
+            self.metrics.error("parse")
+            logger.error(f"Failed to parse book: {book_url} - {e}")
+            os.remove(output_path)
             return
 
-        soup = BeautifulSoup(book_page, 'lxml')
-        sections = soup.find_all('div', class_=re.compile('page n.*'))
-        res_list = []
-        for section in sections:
-            section_text = ''.join(p.text.strip() for p in section.find_all('p') if p.text.strip())
-            if section_text:
-                res_list.append({'text': section_text})
-
-        self.save_to_txt(res_list, book_id)
+        self.metrics.item_saved()
+        logger.info(f"Data successfully saved to: {output_path}")
 
     def crawl_books(self):
         """Crawl the list of books and call specific book crawlers"""
@@ -72,11 +160,13 @@ class EnglishBookCrawler:
         book_urls = [item.a['href'] for item in books]
 
         logger.info(f"Found {len(book_urls)} books, starting multithreaded crawling")
+        self.metrics.queue_depth(len(book_urls))
 
         # Use thread pool to crawl book content concurrently
         with ThreadPoolExecutor(max_workers=5) as executor:
             executor.map(self.fetch_book_content, book_urls)
 
+        self.metrics.close()
         logger.info("All books have been crawled")
 
 if __name__ == "__main__":
@@ -1,32 +1,45 @@
+import logging
 import requests
 from bs4 import BeautifulSoup
 import re
 import os
 import datetime
 from concurrent.futures import ThreadPoolExecutor
+from utils.metrics import CrawlMetrics
 
 class ChinaDailyCrawler:
-    def __init__(self, start_year, end_year):
+    def __init__(self, start_year, end_year, metrics=None, base_url="http://www.chinadaily.com.cn/cndy/",
+                 save_path="./english_data/China_Daily/", auto_crawl=True):
         # base URL
-        self.base_url = "http://www.chinadaily.com.cn/cndy/"
+        self.base_url = base_url
         self.start_year = start_year
         self.end_year = end_year
+        self.metrics = CrawlMetrics("china_daily", metrics)
         
         # save path
-        os.makedirs("./english_data/China_Daily/", exist_ok=True)
+        self.save_path = save_path
+        os.makedirs(self.save_path, exist_ok=True)
+
+        if auto_crawl:
+            self.crawl()
+
+    def crawl(self):
+
+        """crawl all years from start_year to end_year"""
 
         # multi-thread crawling
         with ThreadPoolExecutor(max_workers=5) as executor:
             for year in range(self.start_year, self.end_year + 1):
                 executor.submit(self.crawl_year, year)
 
+        self.metrics.close()
+
     def crawl_year(self, year):
 
         """crawl news for a specific year"""
 
         print(f"Begin process year: {year}")
-        news_url_list = []
-        file_path = f"./english_data/China_Daily/{year}.txt"
+        file_path = os.path.join(self.save_path, f"{year}.txt")
 
         # start and end date of the year
         start_date = datetime.date(year, 1, 1)
@@ -37,13 +50,14 @@ class ChinaDailyCrawler:
         while current_date <= end_date:
             formatted_date = current_date.strftime("%Y-%m/%d/")
             index_url = f"{self.base_url}{formatted_date}index1.html"
-            print(f"Fetching news for date: {current_date}")
 
             # obtain news URL list
+            news_url_list = []
             self.get_news_url_list(index_url, formatted_date, news_url_list)
 
             # obtain news content
-            for news_url in news_url_list:
+            for i, news_url in enumerate(news_url_list):
+                self.metrics.queue_depth(len(news_url_list) - i, queue=str(year))
                 news_text = self.get_text(news_url)
                 if news_text.strip():
                     self.save_text(file_path, news_text)
@@ -57,17 +71,13 @@ class ChinaDailyCrawler:
         """obtain news URL list from the index page"""
 
         try:
-            response = requests.get(root_url)
+            with self.metrics.timer("fetch"):
+                response = requests.get(root_url)
+            self.metrics.page(len(response.content))
             response.encoding = 'utf-8'
-            html = response.text
-
-            # extract news links using regular expression
-            news_links = re.findall(r"content_.*?\.htm", html)
-            for link in news_links:
-                full_url = f"{self.base_url}{date_path}{link}"
-                news_url_list.append(full_url)
-                print(f"Found news URL: {full_url}")
+            news_url_list.extend(self.parse_news_url_list(response.text, date_path))
         except requests.RequestException as e:
+            self.metrics.error("fetch")
             print(f"Error fetching URL list: {e}")
 
     def get_text(self, news_url):
@@ -75,32 +85,52 @@ class ChinaDailyCrawler:
         """obtain news content from the news page"""
 
         try:
-            response = requests.get(news_url)
+            with self.metrics.timer("fetch"):
+                response = requests.get(news_url)
+            self.metrics.page(len(response.content))
             response.encoding = 'utf-8'
-            html = response.text
+            return self.parse_text(response.text)
+        except requests.RequestException as e:
+            self.metrics.error("fetch")
+            print(f"Error fetching text from {news_url}: {e}")
+            return ""
 
+    def parse_news_url_list(self, html, date_path):
+
+        """extract news URLs from the index page"""
+
+        # extract news links using regular expression
+        with self.metrics.timer("parse"):
+            news_links = re.findall(r"content_.*?\.htm", html)
+        return [f"{self.base_url}{date_path}{link}" for link in news_links]
+
+    def parse_text(self, html):
+
+        """extract title and content from the news page"""
+
+        with self.metrics.timer("parse"):
             soup = BeautifulSoup(html, 'html.parser')
             title = soup.select_one('.lft_art > h1').get_text() if soup.select_one('.lft_art > h1') else ""
             content = soup.select_one('#Content').get_text() if soup.select_one('#Content') else ""
 
-            return f"{title}\n\n{content}" if title or content else ""
-        except requests.RequestException as e:
-            print(f"Error fetching text from {news_url}: {e}")
-            return ""
+        return f"{title}\n\n{content}" if title or content else ""
 
     def save_text(self, file_path, text):
 
         """save news content to a file"""
 
         try:
-            with open(file_path, 'a', encoding='utf-8') as file:
+            with self.metrics.timer("write"), open(file_path, 'a', encoding='utf-8') as file:
                 file.write(text + "\n\n")
-            print(f"Content saved to {file_path}")
+            self.metrics.item_saved()
         except IOError as e:
+            self.metrics.error("write")
             print(f"Error saving text: {e}")
 
 
 if __name__ == "__main__":
+    # show the periodic metrics summary
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     start_year = 2015
     end_year = 2024
     ChinaDailyCrawler(start_year, end_year)
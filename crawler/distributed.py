@@ -0,0 +1,238 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+"""Distributed crawling of China Daily and Southern Weekly over a shared work queue
+
+The coordinator seeds units (source x date, source x term page) into the
+queue; any number of worker processes, on one or several machines, lease
+units, add the article units they discover and write per-worker output
+shards. Examples:
+
+    python -m crawler.distributed seed --queue crawl_queue.db --china-daily 2015 2024 --infzm 1 2 3 4 5 6 7
+    python -m crawler.distributed work --queue crawl_queue.db --processes 8
+    python -m crawler.distributed status --queue crawl_queue.db
+    python -m crawler.distributed requeue --queue crawl_queue.db
+
+`status` lists the units that failed for good; `requeue` queues them again
+with a fresh attempt count. A failed list page loses the rest of its term
+until it is requeued.
+
+Use a SQLite file for workers on one machine and redis://host:port/db for
+workers on several machines.
+"""
+
+import os
+import sys
+import time
+import socket
+import logging
+import argparse
+import datetime
+import requests
+from concurrent.futures import ProcessPoolExecutor
+from utils.metrics import MetricsRegistry, CrawlMetrics
+from utils.work_queue import open_queue
+from crawler.china_daily_crawler import ChinaDailyCrawler
+from crawler.southern_weekly_crawler import InfzmCrawler
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger()
+
+# responses worth retrying; other error statuses mean there is nothing to crawl
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def china_daily_units(start_year, end_year):
+    """One unit per day, like ChinaDailyCrawler.crawl_year"""
+    current_date = datetime.date(start_year, 1, 1)
+    while current_date.year <= end_year:
+        yield {'source': 'china_daily', 'kind': 'date', 'date': current_date.isoformat()}
+        current_date += datetime.timedelta(days=1)
+
+
+def infzm_units(term_ids):
+    """The first list page of each term; workers queue the following pages"""
+    for term_id in term_ids:
+        yield {'source': 'southern_weekly', 'kind': 'page', 'term_id': term_id, 'page': 1}
+
+
+class DistributedWorker:
+    """Lease units from the queue until it is drained"""
+
+    def __init__(self, queue, worker_id, metrics=None, china_daily_url="http://www.chinadaily.com.cn/cndy/",
+                 infzm_url="http://www.infzm.com/contents", china_daily_path="./english_data/China_Daily/",
+                 infzm_path='chinese_data/Southern_weekly/', timeout=30):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.timeout = timeout
+        self.registry = metrics or MetricsRegistry()
+        self.china_daily = ChinaDailyCrawler(None, None, metrics=self.registry, base_url=china_daily_url,
+                                             save_path=china_daily_path, auto_crawl=False)
+        self.infzm = InfzmCrawler([], metrics=self.registry, base_url=infzm_url, save_path=infzm_path,
+                                  auto_crawl=False)
+        self.handlers = {
+            ('china_daily', 'date'): self.handle_china_daily_date,
+            ('china_daily', 'article'): self.handle_china_daily_article,
+            ('southern_weekly', 'page'): self.handle_infzm_page,
+            ('southern_weekly', 'article'): self.handle_infzm_article,
+        }
+
+    def fetch(self, url, metrics, headers=None):
+        """Fetch a page, raising on errors that should be retried; returns None for missing pages"""
+        with metrics.timer("fetch"):
+            response = requests.get(url, headers=headers, timeout=self.timeout)
+        metrics.page(len(response.content))
+        if response.status_code in RETRY_STATUS:
+            response.raise_for_status()
+        if response.status_code >= 400:
+            return None
+        return response
+
+    def shard_name(self, name):
+        """Output file of this worker, so workers never append to the same file"""
+        return f"{name}.{self.worker_id}.txt"
+
+    def handle_china_daily_date(self, payload):
+        date = datetime.date.fromisoformat(payload['date'])
+        date_path = date.strftime("%Y-%m/%d/")
+        response = self.fetch(f"{self.china_daily.base_url}{date_path}index1.html", self.china_daily.metrics)
+        if response is None:
+            return
+        response.encoding = 'utf-8'
+        news_url_list = self.china_daily.parse_news_url_list(response.text, date_path)
+        self.queue.put({'source': 'china_daily', 'kind': 'article', 'year': date.year, 'url': url}
+                       for url in news_url_list)
+
+    def handle_china_daily_article(self, payload):
+        response = self.fetch(payload['url'], self.china_daily.metrics)
+        if response is None:
+            return
+        response.encoding = 'utf-8'
+        news_text = self.china_daily.parse_text(response.text)
+        if news_text.strip():
+            file_path = os.path.join(self.china_daily.save_path, self.shard_name(payload['year']))
+            self.china_daily.save_text(file_path, news_text)
+
+    def handle_infzm_page(self, payload):
+        term_id, page = payload['term_id'], payload['page']
+        url = f"{self.infzm.base_url}?term_id={term_id}&page={page}&format=json"
+        response = self.fetch(url, self.infzm.metrics, self.infzm.headers)
+        if response is None:
+            return
+        response.encoding = response.apparent_encoding
+        if not response.text.strip():
+            return
+        articles = [{'source': 'southern_weekly', 'kind': 'article', 'term_id': term_id, 'news_id': news_id,
+                     'title': title} for news_id, title in self.infzm.parse_news_list(response.text)]
+        if articles:
+            self.queue.put(articles + [dict(payload, page=page + 1)])
+
+    def handle_infzm_article(self, payload):
+        response = self.fetch(f"{self.infzm.base_url}/{payload['news_id']}", self.infzm.metrics, self.infzm.headers)
+        if response is None:
+            return
+        response.encoding = response.apparent_encoding
+        news_content = self.infzm.parse_news_content(response.text)
+        full_content = f"{payload['title']}\n{news_content}"
+        self.infzm.save_file(self.infzm.save_path, self.shard_name(f"term_{payload['term_id']}"), full_content)
+
+    def run(self, poll_interval=1.0):
+        """Process units until no unit is pending or leased by any worker"""
+        processed = 0
+        while True:
+            unit = self.queue.lease(self.worker_id)
+            if unit is None:
+                if self.queue.is_drained():
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            metrics = CrawlMetrics(unit.payload['source'], self.registry)
+            try:
+                self.handlers[unit.payload['source'], unit.payload['kind']](unit.payload)
+                if not self.queue.complete(unit):
+                    logger.warning(f"Unit {unit.id} finished after its lease expired and was leased again")
+            except Exception as e:
+                metrics.error(unit.payload['kind'])
+                if self.queue.fail(unit, e):
+                    metrics.retry()
+                logger.warning(f"Unit {unit.id} failed (attempt {unit.attempts}): {e}")
+
+            processed += 1
+            if processed % 100 == 0:
+                metrics.queue_depth(self.queue.stats().get('pending', 0), queue='shared')
+        return processed
+
+
+def worker_main(queue_url, worker_id, options):
+    """Entry point of one worker process"""
+    queue = open_queue(queue_url, visibility_timeout=options['visibility_timeout'],
+                       max_attempts=options['max_attempts'])
+    metrics_file = os.path.join(options['metrics_dir'], f"{worker_id}.json") if options['metrics_dir'] else None
+    registry = MetricsRegistry(output_file=metrics_file)
+    worker = DistributedWorker(queue, worker_id, metrics=registry, china_daily_url=options['china_daily_url'],
+                               infzm_url=options['infzm_url'], china_daily_path=options['china_daily_path'],
+                               infzm_path=options['infzm_path'])
+    processed = worker.run(poll_interval=options['poll_interval'])
+    registry.close()
+    return processed
+
+
+def run_workers(queue_url, processes, options):
+    """Start `processes` local worker processes and wait for the queue to drain"""
+    node = socket.gethostname()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(worker_main, queue_url, f"{node}-{os.getpid()}-{i}", options)
+                   for i in range(processes)]
+        return sum(future.result() for future in futures)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['seed', 'work', 'status', 'requeue'])
+    parser.add_argument('--queue', default='crawl_queue.db', help="SQLite file or redis:// URL")
+    parser.add_argument('--visibility-timeout', type=float, default=300, help="seconds a leased unit stays hidden")
+    parser.add_argument('--max-attempts', type=int, default=3)
+
+    seed = parser.add_argument_group('seed')
+    seed.add_argument('--china-daily', type=int, nargs=2, metavar=('START_YEAR', 'END_YEAR'))
+    seed.add_argument('--infzm', type=int, nargs='+', metavar='TERM_ID')
+
+    work = parser.add_argument_group('work')
+    work.add_argument('--processes', type=int, default=4)
+    work.add_argument('--poll-interval', type=float, default=1.0)
+    work.add_argument('--metrics-dir', help="write each worker's metrics to <dir>/<worker>.json")
+    work.add_argument('--china-daily-url', default="http://www.chinadaily.com.cn/cndy/")
+    work.add_argument('--infzm-url', default="http://www.infzm.com/contents")
+    work.add_argument('--china-daily-path', default="./english_data/China_Daily/")
+    work.add_argument('--infzm-path', default='chinese_data/Southern_weekly/')
+    args = parser.parse_args(argv)
+
+    queue = open_queue(args.queue, visibility_timeout=args.visibility_timeout, max_attempts=args.max_attempts)
+    if args.command == 'seed':
+        added = 0
+        if args.china_daily:
+            added += queue.put(china_daily_units(*args.china_daily))
+        if args.infzm:
+            added += queue.put(infzm_units(args.infzm))
+        logger.info(f"Queued {added} units")
+    elif args.command == 'work':
+        options = {key: getattr(args, key) for key in (
+            'visibility_timeout', 'max_attempts', 'poll_interval', 'metrics_dir', 'china_daily_url', 'infzm_url',
+            'china_daily_path', 'infzm_path')}
+        processed = run_workers(args.queue, args.processes, options)
+        logger.info(f"Processed {processed} units")
+    elif args.command == 'requeue':
+        logger.info(f"Requeued {queue.requeue_failed()} failed units")
+
+    stats = queue.stats()
+    logger.info(f"Queue status: {stats}")
+    if args.command == 'status':
+        for unit, error in queue.failed_units():
+            logger.info(f"Failed unit {unit.id} after {unit.attempts} attempts: {unit.payload} - {error}")
+    elif stats.get('failed'):
+        logger.warning(f"{stats['failed']} units failed for good; list them with 'status' and retry with 'requeue'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,20 +6,21 @@ from lxml import etree
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from concurrent.futures import ThreadPoolExecutor
+from utils.metrics import CrawlMetrics
 
 # 设置日志配置
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=logging.INFO)
 
 # Edge驱动路径
 driver_path = "D:\\edge\\edgedriver_win64\\msedgedriver.exe"
 class GlobalTimesCrawler:
-    def __init__(self, url, columns, save_path, max_pages=10, wait_time=1):
+    def __init__(self, url, columns, save_path, max_pages=10, wait_time=1, metrics=None, driver_path=driver_path):
         self.url = url
         self.columns = columns
         self.save_path = save_path
         self.max_pages = max_pages
         self.wait_time = wait_time
-        driver_path = "D:\\edge\\edgedriver_win64\\msedgedriver.exe"
+        self.metrics = CrawlMetrics("global_times", metrics)
         self.driver = webdriver.Edge(executable_path=driver_path)
         self.driver.implicitly_wait(10)
         os.makedirs(save_path, exist_ok=True)
@@ -30,38 +31,48 @@ class GlobalTimesCrawler:
             for future in futures:
                 future.result()
         self.driver.quit()
+        self.metrics.close()
         print("Finished crawling Global Times news")
 
     def fetch_url(self, url):
         """obtain HTML content from the URL"""
         try:
-            self.driver.get(url)
-            time.sleep(self.wait_time)
-            return self.driver.page_source
+            with self.metrics.timer("fetch"):
+                self.driver.get(url)
+                time.sleep(self.wait_time)
+                html = self.driver.page_source
+            self.metrics.page(len(html.encode('utf-8')))
+            return html
         except Exception as e:
+            self.metrics.error("fetch")
             logging.error(f"Error fetching URL {url}: {e}")
             return ""
 
     def parse_news_list(self, html):
         """parse the news list page and extract news title, link"""
         try:
-            html_tree = etree.HTML(html)
-            articles = html_tree.xpath('//div[@class="level01_list"]//div[@class="list_info"]/a')
+            with self.metrics.timer("parse"):
+                html_tree = etree.HTML(html)
+                articles = html_tree.xpath('//div[@class="level01_list"]//div[@class="list_info"]/a')
+            self.metrics.queue_depth(len(articles))
             for article in articles:
                 title = article.xpath('./text()')[0].strip()
                 link = article.xpath('./@href')[0]
                 yield title, link
         except Exception as e:
+            self.metrics.error("parse")
             logging.error(f"Error parsing news list: {e}")
 
     def parse_news_content(self, html):
         """parse the news content page and extract the news content"""
         try:
-            html_tree = etree.HTML(html)
-            content_lst = html_tree.xpath('//div[@class="article_page"]//div[@class="article_content"]//div[@class="article_right"]/br')
-            content = "\n".join([one.tail.strip() for one in content_lst if one.tail])
+            with self.metrics.timer("parse"):
+                html_tree = etree.HTML(html)
+                content_lst = html_tree.xpath('//div[@class="article_page"]//div[@class="article_content"]//div[@class="article_right"]/br')
+                content = "\n".join([one.tail.strip() for one in content_lst if one.tail])
             return content
         except Exception as e:
+            self.metrics.error("parse")
             logging.error(f"Error parsing news content: {e}")
             return ""
 
@@ -69,9 +80,11 @@ class GlobalTimesCrawler:
         """save the content to the file"""
         try:
             filename = os.path.join(self.save_path, f"{column}_news.txt")
-            with open(filename, 'a', encoding='utf-8') as f:
+            with self.metrics.timer("write"), open(filename, 'a', encoding='utf-8') as f:
                 f.write(f"{title}\n{content}\n\n")
+            self.metrics.item_saved()
         except IOError as e:
+            self.metrics.error("write")
             logging.error(f"Error saving file: {e}")
 
     def download_news(self, column):
@@ -79,7 +92,7 @@ class GlobalTimesCrawler:
         logging.info(f"getting news_columns: {column}")
         page = 1
         while page <= self.max_pages:
-            logging.info(f"getting {column} Page {page} ")
+            logging.debug(f"getting {column} Page {page} ")
             url = f"{self.url}/{column}"
             html = self.fetch_url(url)
             if not html:
@@ -1,71 +1,91 @@
 import os
+import logging
 import requests
 import json
 from bs4 import BeautifulSoup
 from concurrent.futures import ThreadPoolExecutor
+from utils.metrics import CrawlMetrics
 
 
 class InfzmCrawler:
-    def __init__(self, term_ids):
+    def __init__(self, term_ids, metrics=None, base_url="http://www.infzm.com/contents",
+                 save_path='chinese_data/Southern_weekly/', auto_crawl=True):
         self.headers = {
             'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
             'user-agent': 'Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/68.0.3440.106 Safari/537.36',
         }
-        self.base_url = "http://www.infzm.com/contents"
+        self.base_url = base_url
+        self.metrics = CrawlMetrics("southern_weekly", metrics)
 
         # save path
-        save_path = 'chinese_data/Southern_weekly/'
-        os.makedirs(save_path, exist_ok=True)
+        self.save_path = save_path
+        os.makedirs(self.save_path, exist_ok=True)
 
+        if auto_crawl:
+            self.crawl(term_ids)
+
+    def crawl(self, term_ids):
+        """crawl all pages of the given terms"""
         # multi-thread crawling
         with ThreadPoolExecutor(max_workers=5) as executor:
             for term_id in term_ids:
-                executor.submit(self.download_news, term_id, save_path)
+                executor.submit(self.download_news, term_id, self.save_path)
 
+        self.metrics.close()
         print("Finsihed crawling Southern Weekly.")
 
     def fetch_url(self, url):
         """obtain HTML content from the URL"""
         try:
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
+            with self.metrics.timer("fetch"):
+                response = requests.get(url, headers=self.headers)
+                response.raise_for_status()
+            self.metrics.page(len(response.content))
             response.encoding = response.apparent_encoding
             return response.text
         except requests.RequestException as e:
+            self.metrics.error("fetch")
             print(f"Error fetching URL: {e}")
             return ""
 
     def parse_news_list(self, html):
         """parse the news list page and extract news ID, title"""
         try:
-            news_data = json.loads(html)["data"]["contents"]
+            with self.metrics.timer("parse"):
+                news_data = json.loads(html)["data"]["contents"]
+            self.metrics.queue_depth(len(news_data))
             for news in news_data:
                 yield news["id"], news["subject"]
         except (KeyError, json.JSONDecodeError) as e:
+            self.metrics.error("parse")
             print(f"Error parsing news list: {e}")
 
     def parse_news_content(self, html):
         """parse the news content page and extract the news content"""
         try:
-            soup = BeautifulSoup(html, "html.parser")
-            content_div = soup.find("div", class_="nfzm-content__content")
-            blockquote = content_div.find("blockquote", class_="nfzm-bq") if content_div else None
-            full_text_div = content_div.find("div", class_="nfzm-content__fulltext") if content_div else None
-            paragraphs = full_text_div.find_all("p") if full_text_div else []
-
-            content = blockquote.text + "\n" if blockquote else ""
-            content += "\n".join([p.text for p in paragraphs if p.text.strip()])
+            with self.metrics.timer("parse"):
+                soup = BeautifulSoup(html, "html.parser")
+                content_div = soup.find("div", class_="nfzm-content__content")
+                blockquote = content_div.find("blockquote", class_="nfzm-bq") if content_div else None
+                full_text_div = content_div.find("div", class_="nfzm-content__fulltext") if content_div else None
+                paragraphs = full_text_div.find_all("p") if full_text_div else []
+
+                content = blockquote.text + "\n" if blockquote else ""
+                content += "\n".join([p.text for p in paragraphs if p.text.strip()])
             return content
         except AttributeError as e:
+            self.metrics.error("parse")
             print(f"Error parsing news content: {e}")
             return ""
 
     def save_file(self, path, filename, content):
         """save the content to the file"""
         try:
-            with open(os.path.join(path, filename), 'a', encoding='utf-8') as f:
+            with self.metrics.timer("write"), open(os.path.join(path, filename), 'a', encoding='utf-8') as f:
                 f.write(content + "\n\n")
+            self.metrics.item_saved()
         except IOError as e:
+            self.metrics.error("write")
             print(f"Error saving file: {e}")
 
     def download_news(self, term_id, save_path):
@@ -79,7 +99,7 @@ class InfzmCrawler:
                 break
 
             news_exist = False
-            for news_id, title, publish_time in self.parse_news_list(html):
+            for news_id, title in self.parse_news_list(html):
                 news_exist = True
                 news_url = f"{self.base_url}/{news_id}"
                 news_content = self.parse_news_content(self.fetch_url(news_url))
@@ -92,5 +112,7 @@ class InfzmCrawler:
 
 
 if __name__ == "__main__":
+    # show the periodic metrics summary
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     term_ids = [1, 2, 3, 4, 5, 6, 7]
     InfzmCrawler(term_ids)
@@ -10,6 +10,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from concurrent.futures import ThreadPoolExecutor
+from utils.metrics import CrawlMetrics
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -21,9 +22,10 @@ DRIVER_PATH = "D:\\edge\\edgedriver_win64\\msedgedriver.exe"
 class ThePaperCrawler:
     """Class for crawling news articles from ThePaper"""
 
-    def __init__(self, driver_path, output_dir):
+    def __init__(self, driver_path, output_dir, metrics=None):
         self.driver_path = driver_path
         self.output_dir = output_dir
+        self.metrics = CrawlMetrics("the_paper", metrics)
         self.driver = webdriver.Edge(executable_path=self.driver_path)
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
@@ -51,28 +53,36 @@ class ThePaperCrawler:
         x_path = "//div[@class='news_li']/h2/a"  # Check and update XPath
         try:
             WebDriverWait(self.driver, 15).until(EC.presence_of_element_located((By.XPATH, x_path)))  # Wait for element to load
-            articles = self.driver.find_elements(By.XPATH, x_path)
-            article_data = [(article.text, article.get_attribute("href")) for article in articles]
+            with self.metrics.timer("parse"):
+                articles = self.driver.find_elements(By.XPATH, x_path)
+                article_data = [(article.text, article.get_attribute("href")) for article in articles]
+            self.metrics.queue_depth(len(article_data))
             logger.info(f"Found a total of {len(article_data)} articles")
             return article_data
         except TimeoutException:
+            self.metrics.error("parse")
             logger.error("Timeout while fetching article list; element not found. Please check XPath or page loading status.")
             return []
         except Exception as e:
+            self.metrics.error("parse")
             logger.error(f"Error occurred while fetching article list: {e}")
             return []
 
     def fetch_article_content(self, article_title, article_url):
         """Crawl the content of a single article"""
-        logger.info(f"Starting to crawl article: {article_title}")
-        self.driver.get(article_url)
+        logger.debug(f"Starting to crawl article: {article_title}")
+        with self.metrics.timer("fetch"):
+            self.driver.get(article_url)
+        self.metrics.page(len(self.driver.page_source.encode('utf-8')))
         try:
-            x_path_title = "//main/div[4]/div[1]/div[1]/div/h1"
-            title = self.driver.find_element(By.XPATH, x_path_title).text
+            with self.metrics.timer("parse"):
+                x_path_title = "//main/div[4]/div[1]/div[1]/div/h1"
+                title = self.driver.find_element(By.XPATH, x_path_title).text
 
-            x_path_content = "//main/div[4]/div[1]/div[1]/div/div[2]"
-            article_content = self.driver.find_element(By.XPATH, x_path_content).text
+                x_path_content = "//main/div[4]/div[1]/div[1]/div/div[2]"
+                article_content = self.driver.find_element(By.XPATH, x_path_content).text
         except Exception as e:
+            self.metrics.error("parse")
             logger.error(f"Failed to crawl article: {article_title} - {e}")
             return article_title, None
         return title, article_content
@@ -80,13 +90,14 @@ class ThePaperCrawler:
     def save_to_txt(self, title, content):
         """Save article content to a txt file"""
         file_path = os.path.join(self.output_dir, f"{title[:50]}.txt")  # Prevent filename from being too long
-        with open(file_path, 'w', encoding='utf-8') as f:
+        with self.metrics.timer("write"), open(file_path, 'w', encoding='utf-8') as f:
             f.write(title + "\n" + content)
-        logger.info(f"Article saved to: {file_path}")
+        self.metrics.item_saved()
+        logger.debug(f"Article saved to: {file_path}")
 
-    def crawl(self):
+    def crawl(self, root_url="https://www.thepaper.cn/"):
         """Crawling process"""
-        self.setup_driver("https://www.thepaper.cn/")  # Directly go to the homepage or specified page
+        self.setup_driver(root_url)  # Directly go to the homepage or specified page
         self.scroll_to_bottom()  # Simulate scrolling to load more content
         article_list = self.fetch_article_list()
 
@@ -99,6 +110,7 @@ class ThePaperCrawler:
         for title, content in article_contents:
             if content:
                 self.save_to_txt(title, content)
+        self.metrics.close()
 
 
 if __name__ == '__main__':
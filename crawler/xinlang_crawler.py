@@ -4,49 +4,60 @@ import re
 from bs4 import BeautifulSoup
 from concurrent.futures import ThreadPoolExecutor
 import logging
+from utils.metrics import CrawlMetrics
 
 
 class SinaCrawler:
-    def __init__(self):
+    def __init__(self, metrics=None, base_url="http://news.sina.com.cn/society/"):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/68.0.3440.106 Safari/537.36'
         }
-        self.base_url = "http://news.sina.com.cn/society/"
+        self.base_url = base_url
         self.save_path = 'chinese_data/sina/'
+        self.metrics = CrawlMetrics("sina", metrics)
         os.makedirs(self.save_path, exist_ok=True)
 
         # Use a thread pool for concurrent crawling
         with ThreadPoolExecutor(max_workers=5) as executor:
             executor.submit(self.download_news_list)
 
+        self.metrics.close()
         logging.info("Finished crawling Sina news.")
 
     def fetch_url(self, url):
         """Fetch the HTML content of the specified URL"""
         try:
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
+            with self.metrics.timer("fetch"):
+                response = requests.get(url, headers=self.headers)
+                response.raise_for_status()
+            self.metrics.page(len(response.content))
             response.encoding = response.apparent_encoding
             return response.text
         except requests.RequestException as e:
+            self.metrics.error("fetch")
             logging.error(f"Error fetching URL: {e}")
             return ""
 
     def parse_news_list(self, html):
         """Parse the news list page and extract news titles and URLs"""
         try:
-            soup = BeautifulSoup(html, 'lxml')
-            for tag in soup.find('ul', class_='seo_data_list').find_all('li'):
+            with self.metrics.timer("parse"):
+                soup = BeautifulSoup(html, 'lxml')
+                tags = soup.find('ul', class_='seo_data_list').find_all('li')
+            self.metrics.queue_depth(len(tags))
+            for tag in tags:
                 if tag.a:
                     yield tag.a.string, tag.a.get('href')
         except AttributeError as e:
+            self.metrics.error("parse")
             logging.error(f"Error parsing news list: {e}")
 
     def parse_news_content(self, html):
         """Parse the news content page and extract the main text and other information"""
         try:
-            soup = BeautifulSoup(html, 'lxml')
-            article_tag = soup.find('div', class_='article')
+            with self.metrics.timer("parse"):
+                soup = BeautifulSoup(html, 'lxml')
+                article_tag = soup.find('div', class_='article')
 
             if not article_tag:
                 logging.warning("No article content found.")
@@ -57,15 +68,18 @@ class SinaCrawler:
             fb_www = soup.find('div', 'date-source').a.string if soup.find('div', 'date-source') else "Unknown Source"
             return fb_date, fb_www, article_tag.get_text()
         except AttributeError as e:
+            self.metrics.error("parse")
             logging.error(f"Error parsing news content: {e}")
             return None, None
 
     def save_file(self, filename, content):
         """Save news content to a file"""
         try:
-            with open(os.path.join(self.save_path, filename), 'a', encoding='utf-8') as f:
+            with self.metrics.timer("write"), open(os.path.join(self.save_path, filename), 'a', encoding='utf-8') as f:
                 f.write(content + "\n\n")
+            self.metrics.item_saved()
         except IOError as e:
+            self.metrics.error("write")
             logging.error(f"Error saving file: {e}")
 
     def clean_title(self, title):
@@ -89,7 +103,7 @@ class SinaCrawler:
             filename = f"{title}.txt"
             full_content = f"{fb_date} {fb_www}\nURL: {url}\nTitle: {title}\n\n{content}"
             self.save_file(filename, full_content)
-            logging.info(f"Successfully saved news: {title}")
+            logging.debug(f"Successfully saved news: {title}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,46 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from utils.map_reduce import analyze_sources, analyze_single_string, list_source_shards
+
+
+class MapReduceTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        files = {
+            'top.txt': "A top-level file, read as source '.'",
+            os.path.join('sina', '1.txt'): "The market grew 5% in 2024.\nTrade and growth!",
+            os.path.join('sina', '2.txt'): "",
+            os.path.join('sina', 'nested', '3.txt'): "Nested files belong to their top directory",
+            os.path.join('china_daily', '2023.txt'): "12345 67890",
+            os.path.join('china_daily', '2024.txt'): "  china   daily report\n\nthe the the  ",
+            os.path.join('china_daily', 'notes.md'): "not a text shard",
+        }
+        for path, text in files.items():
+            path = os.path.join(self.directory, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+
+    def test_shards_are_grouped_by_top_directory(self):
+        sources = [source for source, filepath in list_source_shards(self.directory)]
+        self.assertEqual(sources, ['.', 'china_daily', 'china_daily', 'sina', 'sina', 'sina'])
+
+    def test_global_result_equals_single_string_pipeline(self):
+        source_aggregates, global_aggregate = analyze_sources(self.directory, 'english', max_workers=2, chunksize=2)
+        with redirect_stdout(io.StringIO()):
+            expected = analyze_single_string(self.directory, 'english')
+        self.assertEqual(set(source_aggregates), {'.', 'china_daily', 'sina'})
+        self.assertEqual(set(global_aggregate), set(expected))
+        for field, value in expected.items():
+            self.assertEqual(global_aggregate[field], value, field)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import io
+import math
+import random
+import unittest
+from collections import Counter
+from contextlib import redirect_stdout
+
+from utils.common_fun import calculate_ngram_entropy_by_scale
+
+
+def naive_block_entropy(text, n):
+    counts = Counter(text[i:i + n] for i in range(len(text) - n + 1))
+    total = sum(counts.values())
+    return -sum(count / total * math.log2(count / total) for count in counts.values())
+
+
+class NgramEntropyTest(unittest.TestCase):
+
+    def check_against_counter(self, text, scales, max_order):
+        # a small chunk_size makes n-grams cross many chunk boundaries and merges
+        with redirect_stdout(io.StringIO()):
+            results = calculate_ngram_entropy_by_scale(text, scales, max_order=max_order, chunk_size=777)
+        self.assertEqual([scale for scale, _ in results], sorted(scales) + [len(text)])
+        for scale, block_entropies in results:
+            self.assertEqual(len(block_entropies), max_order)
+            for n, entropy in enumerate(block_entropies, 1):
+                self.assertAlmostEqual(entropy, naive_block_entropy(text[:scale], n), places=9,
+                                       msg=f"H_{n} at scale {scale}")
+
+    def test_two_letter_alphabet_exact_and_hashed_orders(self):
+        # 'b' needs 7 bits: orders 1-9 are packed exactly, order 10 is hashed
+        rng = random.Random(0)
+        text = ''.join(rng.choice('ab') for _ in range(6000))
+        self.check_against_counter(text, [1, 700, 2500], max_order=10)
+
+    def test_chinese_text_exact_and_hashed_orders(self):
+        # CJK code points need 15-16 bits: orders 1-4 are packed exactly, 5-7 are hashed
+        rng = random.Random(1)
+        text = ''.join(rng.choice("的一是在不了有和人这中大为上个国我以要他") for _ in range(6000))
+        self.check_against_counter(text, [1, 1000, 3333], max_order=7)
+
+    def test_single_symbol_window_is_zero(self):
+        with redirect_stdout(io.StringIO()):
+            results = calculate_ngram_entropy_by_scale("aaaa", [1], max_order=3)
+        for scale, block_entropies in results:
+            for entropy in block_entropies:
+                self.assertEqual(math.copysign(1, entropy), 1.0)
+                self.assertEqual(entropy, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from utils.work_queue import SQLiteWorkQueue, RedisWorkQueue, WorkQueue
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+class WorkQueueTests:
+    """Queue semantics shared by every backend; subclasses provide make_queue"""
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('utils.work_queue.time.time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.queue = self.make_queue(visibility_timeout=10, max_attempts=2, retry_delay=5)
+
+    def test_put_skips_queued_payloads(self):
+        self.assertEqual(self.queue.put([{'n': 1}, {'n': 2}]), 2)
+        self.assertEqual(self.queue.put([{'n': 2}, {'n': 3}]), 1)
+        self.assertEqual(self.queue.stats()['pending'], 3)
+
+    def test_lease_in_order_until_empty(self):
+        self.queue.put([{'n': 1}, {'n': 2}])
+        first = self.queue.lease('a')
+        second = self.queue.lease('b')
+        self.assertEqual((first.payload, first.attempts, first.worker), ({'n': 1}, 1, 'a'))
+        self.assertEqual(second.payload, {'n': 2})
+        self.assertIsNone(self.queue.lease('c'))
+        self.assertFalse(self.queue.is_drained())
+        self.assertTrue(self.queue.complete(first))
+        self.assertTrue(self.queue.complete(second))
+        self.assertTrue(self.queue.is_drained())
+        self.assertEqual(self.queue.stats()['done'], 2)
+
+    def test_expired_lease_is_handed_out_again(self):
+        self.queue.put([{'n': 1}])
+        unit = self.queue.lease('a')
+        self.assertIsNone(self.queue.lease('b'))
+        self.now += 11
+        again = self.queue.lease('b')
+        self.assertEqual((again.id, again.attempts, again.worker), (unit.id, 2, 'b'))
+
+    def test_fail_retries_after_delay_then_gives_up(self):
+        self.queue.put([{'n': 1}])
+        unit = self.queue.lease('a')
+        self.assertTrue(self.queue.fail(unit, 'boom'))
+        self.assertIsNone(self.queue.lease('a'))
+        self.now += 5
+        unit = self.queue.lease('a')
+        self.assertEqual(unit.attempts, 2)
+        self.assertFalse(self.queue.fail(unit, 'boom'))
+        self.assertEqual(self.queue.stats()['failed'], 1)
+        self.assertTrue(self.queue.is_drained())
+
+    def test_lease_expired_on_last_attempt_gives_up(self):
+        self.queue.put([{'n': 1}])
+        self.queue.lease('a')
+        self.now += 11
+        self.queue.lease('b')
+        self.now += 11
+        self.assertIsNone(self.queue.lease('c'))
+        self.assertEqual(self.queue.stats()['failed'], 1)
+        self.assertTrue(self.queue.is_drained())
+
+    def test_late_fail_after_lease_was_taken_over(self):
+        self.queue.put([{'n': 1}])
+        stale = self.queue.lease('a')
+        self.now += 11
+        current = self.queue.lease('b')
+        self.assertTrue(self.queue.complete(current))
+        self.assertFalse(self.queue.fail(stale, 'late'))
+        self.assertFalse(self.queue.complete(stale))
+        self.assertEqual(self.queue.stats()['done'], 1)
+        self.assertIsNone(self.queue.lease('c'))
+
+    def test_late_complete_before_unit_was_leased_again(self):
+        self.queue.put([{'n': 1}])
+        stale = self.queue.lease('a')
+        self.now += 11
+        self.queue.put([{'n': 2}])
+        other = self.queue.lease('b')
+        self.assertEqual(other.payload, {'n': 2})
+        self.assertTrue(self.queue.complete(stale))
+        self.assertTrue(self.queue.complete(other))
+        self.assertIsNone(self.queue.lease('c'))
+        self.assertTrue(self.queue.is_drained())
+
+    def test_failed_units_can_be_listed_and_requeued(self):
+        self.queue.put([{'n': 1}, {'n': 2}])
+        unit = self.queue.lease('a')
+        self.assertTrue(self.queue.fail(unit, 'boom'))
+        self.now += 5
+        self.queue.complete(self.queue.lease('a'))
+        unit = self.queue.lease('a')
+        self.assertFalse(self.queue.fail(unit, 'gave up'))
+        [(failed, error)] = self.queue.failed_units()
+        self.assertEqual((failed.id, failed.payload, failed.attempts, error), (unit.id, {'n': 1}, 2, 'gave up'))
+
+        self.assertEqual(self.queue.requeue_failed(), 1)
+        self.assertEqual(self.queue.failed_units(), [])
+        self.assertFalse(self.queue.complete(unit))
+        again = self.queue.lease('b')
+        self.assertEqual((again.id, again.attempts), (unit.id, 1))
+        self.assertTrue(self.queue.complete(again))
+        self.assertTrue(self.queue.is_drained())
+
+
+class SQLiteWorkQueueTest(WorkQueueTests, unittest.TestCase):
+
+    def make_queue(self, **kwargs):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        queue = SQLiteWorkQueue(os.path.join(directory.name, 'queue.db'), **kwargs)
+        self.addCleanup(queue.conn.close)
+        return queue
+
+    def test_lease_reads_the_index_without_sorting(self):
+        plan = self.queue.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id, payload, attempts FROM units INDEXED BY units_leasable "
+            "WHERE status IN ('pending', 'leased') AND available_at <= ? ORDER BY available_at, id LIMIT 1",
+            (self.now,)).fetchall()
+        self.assertFalse([row for row in plan if 'TEMP B-TREE' in row[-1]])
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class RedisWorkQueueTest(WorkQueueTests, unittest.TestCase):
+
+    def make_queue(self, **kwargs):
+        return RedisWorkQueue(fakeredis.FakeStrictRedis(), **kwargs)
+
+
+class WorkQueueInterfaceTest(unittest.TestCase):
+
+    def test_backends_implement_the_interface(self):
+        with self.assertRaises(TypeError):
+            WorkQueue()
+        self.assertTrue(issubclass(SQLiteWorkQueue, WorkQueue))
+        self.assertTrue(issubclass(RedisWorkQueue, WorkQueue))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import os
 import re
 import math
+from itertools import islice
 from collections import Counter
 import matplotlib.pyplot as plt
 import numpy as np
@@ -16,6 +17,21 @@ def tokenize_and_count_words(text):
     words = jieba.lcut(text)  
     return words
 
+# 惰性生成jieba分词结果：清洗后的文本没有标点，jieba会把全文当作一个整体建图，
+# 因此按slice_size个字符分段分词，内存只与分段大小有关
+# 每段的最后一个词并入下一段重新分词，减少词语在分段边界被切断；
+# 依赖更长上下文的切分在边界处仍可能与整体分词略有不同
+def iter_words_chinese(text, slice_size=100000):
+    carry = ''
+    for start in range(0, len(text), slice_size):
+        words = jieba.lcut(carry + text[start:start + slice_size])
+        carry = words.pop() if start + slice_size < len(text) else ''
+        yield from words
+
+# 惰性生成清洗后英文文本中的单词，与text.split()结果一致
+def iter_words_english(text):
+    return map(re.Match.group, re.finditer(r'\S+', text))
+
 # 清洗英文文本
 def clean_text_english(text):
     text = text.lower()  # 转小写
@@ -49,14 +65,22 @@ def read_txt_file(filepath):
     with open(filepath, 'r', encoding='utf-8') as f:
         return f.read()
 
-# 读取文件夹中的所有txt文件
+# 列出文件夹及其子文件夹（各爬虫的输出目录）中的所有txt文件，按路径排序，保证每次合并顺序一致
+def list_txt_files(directory):
+    filepaths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.endswith(".txt"):
+                filepaths.append(os.path.join(root, filename))
+    return filepaths
+
+# 读取文件夹及其子文件夹中的所有txt文件，与utils/map_reduce.py的分片顺序一致
 def read_multiple_txt_files(directory):
     all_texts = []
-    for filename in os.listdir(directory):
-        if filename.endswith(".txt"):
-            filepath = os.path.join(directory, filename)
-            print(f"正在读取文件: {filepath}")
-            all_texts.append(read_txt_file(filepath))
+    for filepath in list_txt_files(directory):
+        print(f"正在读取文件: {filepath}")
+        all_texts.append(read_txt_file(filepath))
     return all_texts
 
 # 统计文本信息：清洗前后的字符数量
@@ -71,13 +95,19 @@ def report_text_statistics(original_text, cleaned_text):
 
 # 计算熵
 def calculate_entropy(text):
-    letter_counts = Counter(text)
-    total_letters = sum(letter_counts.values())
-    entropy = 0
-    for letter, count in letter_counts.items():
-        p_x = count / total_letters
-        entropy -= p_x * math.log2(p_x)
-    return entropy
+    return entropy_from_counts(Counter(text))
+
+# 根据出现次数计算熵：counts为Counter等字典或计数数组，total默认为全部计数之和
+def entropy_from_counts(counts, total=None):
+    if isinstance(counts, dict):
+        counts = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+    if total is None:
+        total = counts.sum()
+    if total <= 0:
+        return 0.0
+    p = counts / total
+    # 只有一种符号时结果为-0.0，统一为0.0
+    return max(0.0, float(-(p * np.log2(p)).sum()))
 
 # 计算不同规模下的熵并输出每个规模对应的熵
 def calculate_entropy_by_scale(text, scale_intervals):
@@ -92,19 +122,140 @@ def calculate_entropy_by_scale(text, scale_intervals):
     
     return entropy_results
 
+# 将文本编码为Unicode码位数组
+def encode_text(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+
+# 计算一段码位数组中1..max_order阶n-gram的编码，只保留结束位置不早于offset的n-gram
+# 前64 // bits阶按位拼接（精确），更高阶在此基础上使用64位多项式滚动哈希（冲突概率可忽略）
+def iter_ngram_codes(codes, max_order, offset, bits):
+    exact_orders = 64 // bits
+    multiplier = np.uint64(0x100000001B3)
+    shift = np.uint64(bits)
+    ngrams = codes
+    for n in range(1, max_order + 1):
+        if n > 1:
+            if n <= exact_orders:
+                ngrams = (ngrams[:-1] << shift) | codes[n - 1:]
+            else:
+                ngrams = ngrams[:-1] * multiplier + codes[n - 1:]
+        yield n, ngrams[max(0, offset - n + 1):]
+
+# 合并两组已排序的（n-gram编码, 出现次数），按二分查找定位新编码，无需重新排序
+def merge_ngram_counts(old, new):
+    if old is None:
+        return new
+    old_keys, old_counts = old
+    new_keys, new_counts = new
+    positions = np.searchsorted(old_keys, new_keys)
+    found = positions < len(old_keys)
+    found[found] = old_keys[positions[found]] == new_keys[found]
+    counts = old_counts.copy()
+    counts[positions[found]] += new_counts[found]
+    missing = ~found
+    keys = np.insert(old_keys, positions[missing], new_keys[missing])
+    counts = np.insert(counts, positions[missing], new_counts[missing])
+    return keys, counts
+
+# 计算不同规模下1..max_order阶的块熵H_n，每个分块一次性统计所有阶
+# 返回[(规模, [H_1, ..., H_max_order]), ...]，最后一项为全部文本
+def calculate_ngram_entropy_by_scale(text, scale_intervals, max_order=6, chunk_size=5000000):
+    checkpoints = sorted(scale for scale in scale_intervals if 0 < scale <= len(text))
+    if not checkpoints or checkpoints[-1] != len(text):
+        checkpoints.append(len(text))
+    bits = max(ord(max(text)).bit_length(), 1) if text else 1
+    ngram_counts = [None] * max_order
+    ngram_results = []
+    start = 0
+
+    for scale in checkpoints:
+        while start < scale:
+            end = min(start + chunk_size, scale)
+            # 向前多取max_order-1个字符，使跨越分块边界的n-gram也被统计
+            buffer_start = max(0, start - max_order + 1)
+            codes = encode_text(text[buffer_start:end])
+            for n, ngrams in iter_ngram_codes(codes, max_order, start - buffer_start, bits):
+                if len(ngrams):
+                    ngram_counts[n - 1] = merge_ngram_counts(ngram_counts[n - 1], np.unique(ngrams, return_counts=True))
+            start = end
+
+        block_entropies = [
+            entropy_from_counts(counts[1], scale - n + 1) if counts is not None else 0.0
+            for n, counts in enumerate(ngram_counts, 1)
+        ]
+        ngram_results.append((scale, block_entropies))
+        print(f"文本规模: {scale} 字符, 块熵: " + ", ".join(f"H_{n}={h:.4f}" for n, h in enumerate(block_entropies, 1)))
+
+    return ngram_results
+
+# 将n元熵结果拆分为各阶块熵与条件熵H_n - H_{n-1}的曲线，用于绘图
+def split_ngram_results(ngram_results):
+    block_series = {}
+    conditional_series = {}
+    for scale, block_entropies in ngram_results:
+        previous = 0.0
+        for n, entropy in enumerate(block_entropies, 1):
+            block_series.setdefault(f"H_{n}", []).append((scale, entropy))
+            conditional_series.setdefault(f"H_{n} - H_{n - 1}", []).append((scale, entropy - previous))
+            previous = entropy
+    return block_series, conditional_series
+
 # 计算齐夫定律（以词为单位）
 def calculate_zipf_law(words):
-    word_counts = Counter(words)
+    return calculate_zipf_law_from_counts(Counter(words))
+
+# 单次遍历词序列，同时统计词频（用于齐夫定律）和Heaps定律曲线
+# Heaps定律曲线为按对数间隔取点的(词数, 词汇量)，每个区间分批计数，内存只与词汇量和batch_size有关
+def calculate_token_statistics(words, points_per_decade=10, batch_size=100000):
+    words = iter(words)
+    word_counts = Counter()
+    heaps_results = []
+    tokens = 0
+    exponent = 0
+    checkpoint = 1
+    while True:
+        batch = list(islice(words, min(checkpoint - tokens, batch_size)))
+        if not batch:
+            break
+        word_counts.update(batch)
+        tokens += len(batch)
+        if tokens == checkpoint:
+            heaps_results.append((tokens, len(word_counts)))
+            while checkpoint <= tokens:
+                exponent += 1
+                checkpoint = math.ceil(10 ** (exponent / points_per_decade))
+    if tokens and heaps_results[-1][0] != tokens:
+        heaps_results.append((tokens, len(word_counts)))
+    return word_counts, heaps_results
+
+# 拟合Heaps定律：词汇量 = K * 词数^beta，返回(K, beta)
+def fit_heaps_law(heaps_results):
+    if len(heaps_results) < 2:
+        return 0.0, 0.0
+    tokens = np.log([n for n, vocabulary in heaps_results])
+    vocabularies = np.log([vocabulary for n, vocabulary in heaps_results])
+    beta, intercept = np.polyfit(tokens, vocabularies, 1)
+    return float(np.exp(intercept)), float(beta)
+
+# 根据词频计数计算齐夫定律的排序结果
+def calculate_zipf_law_from_counts(word_counts):
     sorted_word_counts = sorted(word_counts.items(), key=lambda x: x[1], reverse=True)
     return sorted_word_counts
 
-# 绘制熵随规模变化图
+# 绘制熵随规模变化图，entropy_results也可以是{曲线名: 结果}的字典，如各阶块熵
 def plot_entropy_variation(entropy_results, language, filename="entropy_variation.png"):
-    scales = [scale for scale, entropy in entropy_results]
-    entropies = [entropy for scale, entropy in entropy_results]
+    series = entropy_results if isinstance(entropy_results, dict) else {None: entropy_results}
 
     plt.figure(figsize=(10, 6))
-    plt.plot(scales, entropies, marker='o', linestyle='-', color='b')
+    for label, results in series.items():
+        scales = [scale for scale, entropy in results]
+        entropies = [entropy for scale, entropy in results]
+        if label is None:
+            plt.plot(scales, entropies, marker='o', linestyle='-', color='b')
+        else:
+            plt.plot(scales, entropies, marker='o', linestyle='-', label=label)
+    if None not in series:
+        plt.legend()
     plt.title(f"Entropy Variation with Text Scale ({language})")
     plt.xlabel("Text Scale (number of characters)")
     plt.ylabel("Entropy")
@@ -112,13 +263,29 @@ def plot_entropy_variation(entropy_results, language, filename="entropy_variatio
     plt.savefig(filename)
     plt.show()
 
-# 绘制齐夫定律验证图
-def plot_zipf_law(word_counts, language, filename="zipf_law.png"):
-    ranks = np.log(range(1, len(word_counts) + 1))
+# 拟合齐夫定律指数：log(频率) = -s * log(排名) + c，返回s
+def fit_zipf_exponent(word_counts):
+    if len(word_counts) < 2:
+        return 0.0
+    ranks = np.log(np.arange(1, len(word_counts) + 1))
     frequencies = np.log([freq for word, freq in word_counts])
+    slope, intercept = np.polyfit(ranks, frequencies, 1)
+    return float(-slope)
+
+# 绘制齐夫定律验证图，word_counts也可以是{曲线名: 结果}的字典，用于对比不同来源
+def plot_zipf_law(word_counts, language, filename="zipf_law.png"):
+    series = word_counts if isinstance(word_counts, dict) else {None: word_counts}
 
     plt.figure(figsize=(10, 6))
-    plt.plot(ranks, frequencies, linestyle='-', color='b')
+    for label, counts in series.items():
+        ranks = np.log(range(1, len(counts) + 1))
+        frequencies = np.log([freq for word, freq in counts])
+        if label is None:
+            plt.plot(ranks, frequencies, linestyle='-', color='b')
+        else:
+            plt.plot(ranks, frequencies, linestyle='-', label=label)
+    if None not in series:
+        plt.legend()
     plt.title(f"Zipf's Law Verification ({language})")
     plt.xlabel("Rank (log)")
     plt.ylabel("Frequency (log)")
@@ -126,13 +293,45 @@ def plot_zipf_law(word_counts, language, filename="zipf_law.png"):
     plt.savefig(filename)
     plt.show()
 
-# 保存熵和齐夫定律的结果
-def save_results(entropy_results, zipf_results, output_file):
+# 绘制Heaps定律（词汇增长）验证图
+def plot_heaps_law(heaps_results, language, filename="heaps_law.png"):
+    tokens = np.log([n for n, vocabulary in heaps_results])
+    vocabularies = np.log([vocabulary for n, vocabulary in heaps_results])
+    k, beta = fit_heaps_law(heaps_results)
+
+    plt.figure(figsize=(10, 6))
+    plt.plot(tokens, vocabularies, marker='o', linestyle='-', color='b')
+    if beta:
+        plt.plot(tokens, np.log(k) + beta * tokens, linestyle='--', color='r', label=f"fit: beta={beta:.4f}")
+        plt.legend()
+    plt.title(f"Heaps' Law Verification ({language})")
+    plt.xlabel("Number of tokens (log)")
+    plt.ylabel("Vocabulary size (log)")
+    plt.grid(True)
+    plt.savefig(filename)
+    plt.show()
+
+# 保存熵和齐夫定律的结果，可附带n元块熵与条件熵、Heaps定律曲线
+def save_results(entropy_results, zipf_results, output_file, ngram_results=None, heaps_results=None):
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write("熵的变化:\n")
         for scale, entropy in entropy_results:
             f.write(f"文本规模: {scale}, 熵: {entropy:.4f}\n")
 
+        if ngram_results:
+            f.write("\nn元块熵与条件熵:\n")
+            for scale, block_entropies in ngram_results:
+                previous = 0.0
+                for n, entropy in enumerate(block_entropies, 1):
+                    f.write(f"文本规模: {scale}, n: {n}, 块熵H_n: {entropy:.4f}, 条件熵H_n-H_n-1: {entropy - previous:.4f}\n")
+                    previous = entropy
+
+        if heaps_results:
+            k, beta = fit_heaps_law(heaps_results)
+            f.write(f"\nHeaps定律验证 (K: {k:.4f}, beta: {beta:.4f}):\n")
+            for tokens, vocabulary in heaps_results:
+                f.write(f"词数: {tokens}, 词汇量: {vocabulary}\n")
+
         f.write("\n齐夫定律验证:\n")
         for rank, (word, count) in enumerate(zipf_results, 1):
             f.write(f"Rank: {rank}, 词: {word}, 出现次数: {count}\n")
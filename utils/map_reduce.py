@@ -0,0 +1,162 @@
+import os
+from itertools import repeat
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib.pyplot as plt
+import numpy as np
+from utils.common_fun import (clean_text_chinese, clean_text_english, tokenize_and_count_words, read_txt_file,
+                              list_txt_files, read_multiple_txt_files,
+                              iter_words_chinese, iter_words_english,
+                              entropy_from_counts, calculate_zipf_law_from_counts, fit_zipf_exponent,
+                              plot_zipf_law)
+
+# 合并文本时使用的分隔符，与chinese_analysis.py/english_analysis.py保持一致
+SEPARATORS = {'chinese': '', 'english': ' '}
+
+
+# 按来源列出文本分片：每个子目录为一个来源，目录下直接存放的txt文件归入来源"."
+# 分片与read_multiple_txt_files读取的文件及顺序相同
+def list_source_shards(directory):
+    shards = []
+    for filepath in list_txt_files(directory):
+        relative = os.path.relpath(os.path.dirname(filepath), directory)
+        shards.append((relative.split(os.sep)[0], filepath))
+    return shards
+
+# map：把一个分片统计为字符计数、词频和长度信息
+def map_shard(shard, language):
+    source, filepath = shard
+    text = read_txt_file(filepath)
+    if language == 'chinese':
+        cleaned_text = clean_text_chinese(text)
+        words = iter_words_chinese(cleaned_text)
+    else:
+        cleaned_text = clean_text_english(text)
+        words = iter_words_english(cleaned_text)
+    return {
+        'source': source,
+        'files': 1,
+        'nonempty_files': 1 if cleaned_text else 0,
+        'original_length': len(text),
+        'char_counts': Counter(cleaned_text),
+        'word_counts': Counter(words),
+    }
+
+# reduce：空的合并结果
+def new_aggregate():
+    return {'files': 0, 'nonempty_files': 0, 'original_length': 0, 'char_counts': Counter(), 'word_counts': Counter()}
+
+# reduce：把一个分片的统计结果并入aggregate，需按分片顺序调用
+def add_shard(aggregate, result):
+    aggregate['char_counts'].update(result['char_counts'])
+    aggregate['word_counts'].update(result['word_counts'])
+    aggregate['files'] += result['files']
+    aggregate['nonempty_files'] += result['nonempty_files']
+    aggregate['original_length'] += result['original_length']
+
+# reduce：补上合并文本时的分隔符，得到最终统计
+# 英文文本合并时以空格分隔，清洗后每两个非空文件之间恰好多出一个空格，在此补上
+def finish_aggregate(aggregate, language):
+    separator = SEPARATORS[language]
+    files = aggregate['files']
+    char_counts = aggregate['char_counts']
+    original_length = aggregate['original_length']
+    if files:
+        original_length += len(separator) * (files - 1)
+    if separator and aggregate['nonempty_files'] > 1:
+        char_counts[separator] += aggregate['nonempty_files'] - 1
+    return {
+        'files': files,
+        'original_length': original_length,
+        'cleaned_length': sum(char_counts.values()),
+        'char_counts': char_counts,
+        'word_counts': aggregate['word_counts'],
+    }
+
+# 由合并后的统计计算熵、齐夫定律和长度统计
+def summarize_aggregate(aggregate):
+    word_counts = aggregate['word_counts']
+    tokens = sum(word_counts.values())
+    zipf_results = calculate_zipf_law_from_counts(word_counts)
+    return {
+        'files': aggregate['files'],
+        'original_length': aggregate['original_length'],
+        'cleaned_length': aggregate['cleaned_length'],
+        'entropy': entropy_from_counts(aggregate['char_counts']),
+        'tokens': tokens,
+        'vocabulary': len(word_counts),
+        'mean_word_length': sum(len(word) * count for word, count in word_counts.items()) / tokens if tokens else 0.0,
+        'max_word_length': max((len(word) for word in word_counts), default=0),
+        'zipf_exponent': fit_zipf_exponent(zipf_results),
+        'zipf_results': zipf_results,
+    }
+
+# 并行map所有分片，结果按分片顺序到达时立即并入来源和全局两级reduce，不保留各分片的计数
+# chunksize个分片打包发送给一个子进程，减少小文件的进程间通信开销
+def analyze_sources(directory, language, max_workers=None, chunksize=16):
+    shards = list_source_shards(directory)
+    source_aggregates = {}
+    global_aggregate = new_aggregate()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for result in executor.map(map_shard, shards, repeat(language), chunksize=chunksize):
+            add_shard(source_aggregates.setdefault(result['source'], new_aggregate()), result)
+            add_shard(global_aggregate, result)
+
+    source_aggregates = {source: finish_aggregate(aggregate, language) for source, aggregate in source_aggregates.items()}
+    return source_aggregates, finish_aggregate(global_aggregate, language)
+
+# 按chinese_analysis.py/english_analysis.py的单字符串流程计算同一目录，用于校验map-reduce的全局结果
+def analyze_single_string(directory, language):
+    texts = read_multiple_txt_files(directory)
+    original_text = SEPARATORS[language].join(texts)
+    if language == 'chinese':
+        cleaned_text = clean_text_chinese(original_text)
+        words = tokenize_and_count_words(cleaned_text)
+    else:
+        cleaned_text = clean_text_english(original_text)
+        words = cleaned_text.split()
+    return {
+        'files': len(texts),
+        'original_length': len(original_text),
+        'cleaned_length': len(cleaned_text),
+        'char_counts': Counter(cleaned_text),
+        'word_counts': Counter(words),
+    }
+
+# 保存各来源与全局结果的对比报告
+def save_comparison_report(source_summaries, global_summary, output_file, top_n=20):
+    columns = [('files', '文件数', '{}'), ('original_length', '清洗前字符数', '{}'), ('cleaned_length', '清洗后字符数', '{}'),
+               ('entropy', '熵', '{:.4f}'), ('tokens', '词数', '{}'), ('vocabulary', '词汇量', '{}'),
+               ('mean_word_length', '平均词长', '{:.2f}'), ('max_word_length', '最大词长', '{}'),
+               ('zipf_exponent', '齐夫指数', '{:.4f}')]
+    summaries = dict(source_summaries, **{'全部': global_summary})
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write("来源\t" + "\t".join(title for key, title, fmt in columns) + "\n")
+        for source, summary in summaries.items():
+            f.write(source + "\t" + "\t".join(fmt.format(summary[key]) for key, title, fmt in columns) + "\n")
+
+        for source, summary in summaries.items():
+            f.write(f"\n{source} 高频词:\n")
+            for rank, (word, count) in enumerate(summary['zipf_results'][:top_n], 1):
+                f.write(f"Rank: {rank}, 词: {word}, 出现次数: {count}\n")
+
+# 绘制各来源熵的对比图
+def plot_source_entropy(source_summaries, language, filename="source_entropy.png"):
+    sources = list(source_summaries)
+    entropies = [summary['entropy'] for summary in source_summaries.values()]
+
+    plt.figure(figsize=(10, 6))
+    plt.bar(np.arange(len(sources)), entropies, color='b')
+    plt.xticks(np.arange(len(sources)), sources, rotation=30)
+    plt.title(f"Entropy by Source ({language})")
+    plt.ylabel("Entropy")
+    plt.grid(True, axis='y')
+    plt.tight_layout()
+    plt.savefig(filename)
+    plt.show()
+
+# 绘制各来源齐夫定律的对比图
+def plot_source_zipf_law(source_summaries, global_summary, language, filename="source_zipf_law.png"):
+    series = {source: summary['zipf_results'] for source, summary in source_summaries.items()}
+    series['all'] = global_summary['zipf_results']
+    plot_zipf_law(series, language, filename)
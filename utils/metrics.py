@@ -0,0 +1,346 @@
+import os
+import sys
+import json
+import time
+import bisect
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# latency buckets in seconds, shared by fetch/parse/write histograms
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# where crawlers write their metrics unless they are given a registry
+METRICS_DIR = 'metrics'
+
+
+def peak_rss_bytes():
+    """Highest resident set size of this process so far, None where unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def reset_peak_rss():
+    """Reset the peak RSS reported by stage_peak_rss_bytes, False where unsupported (non-Linux)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def stage_peak_rss_bytes():
+    """Peak RSS since the last reset_peak_rss(), read from VmHWM"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) * 1024
+    return None
+
+
+class Histogram:
+    """Fixed-bucket histogram, cheap enough to observe every request"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside the bucket"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, bucket_count in enumerate(self.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.max
+            if bucket_count and seen + bucket_count >= target:
+                lower = max(lower, self.min)
+                upper = min(upper, self.max)
+                return lower + (upper - lower) * (target - seen) / bucket_count
+            seen += bucket_count
+            lower = upper
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts)),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges, latency histograms and stage timings
+
+    Metrics are keyed by name plus optional labels (e.g. source='china_daily').
+    Instead of logging every item, a one-line summary is logged at most once per
+    `summary_interval` seconds and the full snapshot is written to `output_file`
+    (JSON, or Prometheus text format when the file ends with '.prom').
+
+    Stages always record the process peak RSS, which is cheap to read. With
+    `trace_memory` they also record the peak memory allocated inside the
+    stage via tracemalloc, which makes allocation-heavy code several times
+    slower, so it is meant for benchmarks rather than production runs.
+    """
+
+    def __init__(self, output_file=None, summary_interval=30, trace_memory=False):
+        self.output_file = output_file
+        self.summary_interval = summary_interval
+        self.trace_memory = trace_memory
+        self.start_time = time.time()
+        self._last_summary = time.monotonic()
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.stages = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        """Increase a counter"""
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        self.maybe_report()
+
+    def set_gauge(self, name, value, **labels):
+        """Set a gauge, e.g. the current queue depth"""
+        with self._lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        """Record a value (usually seconds) into a histogram"""
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+        self.maybe_report()
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time a block into the `<name>_seconds` histogram
+
+        Errors are not counted here; callers count the ones they handle.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(f"{name}_seconds", time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def stage(self, name):
+        """Record wall time and peak memory of an analysis stage
+
+        On Linux the process peak RSS is reset when the stage starts, so
+        `peak_rss_bytes` is the peak during the stage. Elsewhere only
+        `peak_rss_growth_bytes` is known: how far the stage raised the peak RSS
+        of the whole process. `peak_memory_bytes` is only set with `trace_memory`.
+        """
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        resettable = reset_peak_rss()
+        process_peak = peak_rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+            if tracing:
+                tracemalloc.stop()
+            rss = stage_peak_rss_bytes() if resettable else None
+            growth = None
+            if not resettable and process_peak is not None:
+                growth = peak_rss_bytes() - process_peak
+            with self._lock:
+                self.stages[name] = {'wall_time': wall_time, 'peak_rss_bytes': rss, 'peak_rss_growth_bytes': growth,
+                                     'peak_memory_bytes': peak}
+            logger.info(f"Stage {name}: {wall_time:.2f}s" +
+                        (f", peak RSS {rss / 1024 / 1024:.1f} MiB" if rss is not None else "") +
+                        (f", peak RSS grew {growth / 1024 / 1024:.1f} MiB" if growth is not None else "") +
+                        (f", peak traced memory {peak / 1024 / 1024:.1f} MiB" if peak is not None else ""))
+
+    def rates(self):
+        """Pages and bytes per second since the registry was created"""
+        with self._lock:
+            return self._rates_locked()
+
+    def _rates_locked(self):
+        # callers hold self._lock, other threads may add counters meanwhile
+        elapsed = max(time.time() - self.start_time, 1e-9)
+        pages = sum(v for (name, _), v in self.counters.items() if name == 'pages_total')
+        size = sum(v for (name, _), v in self.counters.items() if name == 'bytes_total')
+        return {'elapsed': elapsed, 'pages_per_second': pages / elapsed, 'bytes_per_second': size / elapsed}
+
+    def snapshot(self):
+        """Return every metric as a JSON-serializable dict"""
+
+        def flatten(items):
+            return [{'name': name, 'labels': dict(labels), 'value': value} for (name, labels), value in items]
+
+        with self._lock:
+            return {
+                'start_time': self.start_time,
+                'rates': self._rates_locked(),
+                'counters': flatten(self.counters.items()),
+                'gauges': flatten(self.gauges.items()),
+                'histograms': flatten((key, h.to_dict()) for key, h in self.histograms.items()),
+                'stages': dict(self.stages),
+            }
+
+    def to_prometheus(self):
+        """Render the metrics in the Prometheus text exposition format"""
+
+        def fmt_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+        lines = []
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"{name}{fmt_labels(labels)} {value}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                lines.append(f"{name}{fmt_labels(labels)} {value}")
+            for (name, labels), h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(list(h.buckets) + ['+Inf'], h.counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{fmt_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{fmt_labels(labels)} {h.sum}")
+                lines.append(f"{name}_count{fmt_labels(labels)} {h.count}")
+            for stage_name, stage in sorted(self.stages.items()):
+                label = fmt_labels([('stage', stage_name)])
+                lines.append(f"stage_wall_time_seconds{label} {stage['wall_time']}")
+                for key in ('peak_rss_bytes', 'peak_rss_growth_bytes', 'peak_memory_bytes'):
+                    if stage[key] is not None:
+                        lines.append(f"stage_{key}{label} {stage[key]}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, output_file=None):
+        """Write the metrics to a JSON or Prometheus ('.prom') file"""
+        output_file = output_file or self.output_file
+        if not output_file:
+            return
+        directory = os.path.dirname(output_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if output_file.endswith('.prom'):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def summary(self):
+        """One-line summary of throughput, errors and latencies"""
+        with self._lock:
+            rates = self._rates_locked()
+            errors = sum(v for (name, _), v in self.counters.items() if name == 'errors_total')
+            latencies = [f"{name}{list(dict(labels).values()) if labels else ''} "
+                         f"p50={h.quantile(0.5):.3f}s p99={h.quantile(0.99):.3f}s"
+                         for (name, labels), h in sorted(self.histograms.items())]
+        return (f"{rates['pages_per_second']:.2f} pages/s, {rates['bytes_per_second'] / 1024:.1f} KiB/s, "
+                f"{errors} errors" + (", " + ", ".join(latencies) if latencies else ""))
+
+    def maybe_report(self):
+        """Log a summary and flush the output file if the interval elapsed"""
+        now = time.monotonic()
+        if now - self._last_summary < self.summary_interval:
+            return
+        with self._lock:
+            if now - self._last_summary < self.summary_interval:
+                return
+            self._last_summary = now
+        logger.info(self.summary())
+        self.dump()
+
+    def close(self):
+        """Log the final summary and write the output file"""
+        logger.info(self.summary())
+        self.dump()
+        if self.output_file:
+            logger.info(f"Metrics written to {self.output_file}")
+
+
+class CrawlMetrics:
+    """Per-source view of a registry, used by the crawlers
+
+    Without a registry the crawler gets its own, written to
+    `metrics/<source>.json` when the crawl finishes.
+    """
+
+    def __init__(self, source, registry=None):
+        self.source = source
+        self.registry = registry or MetricsRegistry(output_file=os.path.join(METRICS_DIR, f"{source}.json"))
+
+    def timer(self, name):
+        return self.registry.timer(name, source=self.source)
+
+    def observe(self, name, seconds):
+        """Record time measured by the caller into the `<name>_seconds` histogram"""
+        self.registry.observe(f"{name}_seconds", seconds, source=self.source)
+
+    def page(self, size):
+        """Count a fetched page and its size in bytes"""
+        self.registry.inc('pages_total', source=self.source)
+        self.registry.inc('bytes_total', size, source=self.source)
+
+    def item_saved(self):
+        self.registry.inc('items_saved_total', source=self.source)
+
+    def error(self, stage):
+        self.registry.inc('errors_total', stage=stage, source=self.source)
+
+    def retry(self):
+        self.registry.inc('retries_total', source=self.source)
+
+    def queue_depth(self, depth, queue='pending'):
+        self.registry.set_gauge('queue_depth', depth, queue=queue, source=self.source)
+
+    def close(self):
+        self.registry.close()
+
+
+# shared registry of the analysis stages
+default_registry = MetricsRegistry()
@@ -0,0 +1,302 @@
+import json
+import time
+import sqlite3
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+# a leased unit of work; payload is a JSON-serializable dict
+# worker and attempts identify the lease, so a worker whose lease expired cannot finish the unit
+WorkUnit = namedtuple('WorkUnit', ['id', 'payload', 'attempts', 'worker'])
+
+
+def unit_key(payload):
+    """Stable key used to skip units that were already queued"""
+    return json.dumps(payload, sort_keys=True, ensure_ascii=False)
+
+
+class WorkQueue(ABC):
+    """Interface of the shared work queue used by distributed crawling
+
+    Units are leased for `visibility_timeout` seconds. A unit that is neither
+    completed nor failed before its lease expires (e.g. the worker died) is
+    handed out again. Failed units are retried after `retry_delay * attempts`
+    seconds until `max_attempts` is reached. `complete` and `fail` only take
+    effect while the caller still holds the lease, i.e. no other worker
+    leased the unit since.
+    """
+
+    def __init__(self, visibility_timeout=300, max_attempts=3, retry_delay=5):
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    @abstractmethod
+    def put(self, payloads):
+        """Queue payloads that were not queued before, return how many were added"""
+
+    @abstractmethod
+    def lease(self, worker_id):
+        """Lease the next available unit, or return None"""
+
+    @abstractmethod
+    def complete(self, unit):
+        """Mark the unit done, return False if the lease was lost"""
+
+    @abstractmethod
+    def fail(self, unit, error):
+        """Schedule a retry, or give up once max_attempts is reached. Return True if retried
+
+        Nothing changes if the lease was lost.
+        """
+
+    @abstractmethod
+    def stats(self):
+        """Number of units per state: pending, leased, done, failed"""
+
+    @abstractmethod
+    def failed_units(self):
+        """Units that were given up, as (WorkUnit, error) pairs"""
+
+    @abstractmethod
+    def requeue_failed(self):
+        """Queue the failed units again with a fresh attempt count, return how many"""
+
+    def is_drained(self):
+        """True when no unit is pending or leased"""
+        stats = self.stats()
+        return stats.get('pending', 0) + stats.get('leased', 0) == 0
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """Work queue in a SQLite file, shared by worker processes on one machine"""
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS units (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL DEFAULT 0,
+                worker TEXT,
+                error TEXT
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS units_available ON units (status, available_at)")
+        # leasable units in lease order, so lease() reads the first row instead of sorting all of them
+        self.conn.execute("CREATE INDEX IF NOT EXISTS units_leasable ON units (available_at, id) "
+                          "WHERE status IN ('pending', 'leased')")
+
+    def put(self, payloads):
+        rows = [(unit_key(payload), json.dumps(payload, ensure_ascii=False)) for payload in payloads]
+        cursor = self.conn.executemany("INSERT OR IGNORE INTO units (key, payload) VALUES (?, ?)", rows)
+        return cursor.rowcount
+
+    def lease(self, worker_id):
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # units whose lease expired after the last allowed attempt are given up
+            self.conn.execute(
+                "UPDATE units SET status = 'failed', error = 'lease expired' "
+                "WHERE status = 'leased' AND available_at <= ? AND attempts >= ?", (now, self.max_attempts))
+            row = self.conn.execute(
+                "SELECT id, payload, attempts FROM units INDEXED BY units_leasable "
+                "WHERE status IN ('pending', 'leased') AND available_at <= ? ORDER BY available_at, id LIMIT 1",
+                (now,)).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            unit_id, payload, attempts = row
+            self.conn.execute(
+                "UPDATE units SET status = 'leased', attempts = ?, available_at = ?, worker = ? WHERE id = ?",
+                (attempts + 1, now + self.visibility_timeout, worker_id, unit_id))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return WorkUnit(unit_id, json.loads(payload), attempts + 1, worker_id)
+
+    def complete(self, unit):
+        cursor = self.conn.execute(
+            "UPDATE units SET status = 'done', error = NULL WHERE id = ? AND worker = ? AND attempts = ?",
+            (unit.id, unit.worker, unit.attempts))
+        return cursor.rowcount == 1
+
+    def fail(self, unit, error):
+        if unit.attempts >= self.max_attempts:
+            self.conn.execute(
+                "UPDATE units SET status = 'failed', error = ? WHERE id = ? AND worker = ? AND attempts = ?",
+                (str(error), unit.id, unit.worker, unit.attempts))
+            return False
+        cursor = self.conn.execute(
+            "UPDATE units SET status = 'pending', available_at = ?, error = ? "
+            "WHERE id = ? AND worker = ? AND attempts = ?",
+            (time.time() + self.retry_delay * unit.attempts, str(error), unit.id, unit.worker, unit.attempts))
+        return cursor.rowcount == 1
+
+    def stats(self):
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM units GROUP BY status").fetchall())
+
+    def failed_units(self):
+        rows = self.conn.execute(
+            "SELECT id, payload, attempts, worker, error FROM units WHERE status = 'failed'").fetchall()
+        return [(WorkUnit(unit_id, json.loads(payload), attempts, worker), error)
+                for unit_id, payload, attempts, worker, error in rows]
+
+    def requeue_failed(self):
+        # clearing worker and attempts also invalidates the lease token of the last worker
+        cursor = self.conn.execute(
+            "UPDATE units SET status = 'pending', attempts = 0, available_at = 0, worker = NULL "
+            "WHERE status = 'failed'")
+        return cursor.rowcount
+
+
+class RedisWorkQueue(WorkQueue):
+    """Work queue on a Redis-compatible broker, shared by workers on several machines
+
+    `client` is a redis-py style client (e.g. `redis.Redis.from_url(url)`);
+    all keys start with `name`.
+    """
+
+    # queue a payload unless its key was queued before; a crash can't leave a unit marked seen but not queued
+    PUT_SCRIPT = """
+        if redis.call('SADD', KEYS[1], ARGV[1]) == 0 then return 0 end
+        local id = redis.call('INCR', KEYS[2])
+        redis.call('HSET', KEYS[3], id, ARGV[2])
+        redis.call('RPUSH', KEYS[4], id)
+        return 1
+    """
+    # move the due units of a sorted set (expired leases or delayed retries) back to the pending list
+    REQUEUE_SCRIPT = """
+        local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+        for _, id in ipairs(ids) do
+            redis.call('ZREM', KEYS[1], id)
+            redis.call('RPUSH', KEYS[2], id)
+        end
+        return #ids
+    """
+    # pop a pending unit, count the attempt and record its lease and owner in one step;
+    # units whose lease expired after the last allowed attempt are given up
+    LEASE_SCRIPT = """
+        while true do
+            local id = redis.call('LPOP', KEYS[1])
+            if not id then return false end
+            local attempts = redis.call('HINCRBY', KEYS[3], id, 1)
+            if attempts > tonumber(ARGV[2]) then
+                redis.call('HSET', KEYS[4], id, 'lease expired')
+            else
+                redis.call('ZADD', KEYS[2], ARGV[1], id)
+                redis.call('HSET', KEYS[5], id, ARGV[3] .. ':' .. attempts)
+                return {id, attempts, redis.call('HGET', KEYS[6], id)}
+            end
+        end
+    """
+    # move every failed unit back to the pending list with a fresh attempt count
+    REQUEUE_FAILED_SCRIPT = """
+        local ids = redis.call('HKEYS', KEYS[1])
+        for _, id in ipairs(ids) do
+            redis.call('HDEL', KEYS[1], id)
+            redis.call('HDEL', KEYS[2], id)
+            redis.call('HDEL', KEYS[3], id)
+            redis.call('RPUSH', KEYS[4], id)
+        end
+        return #ids
+    """
+    # end a lease held by ARGV[2] ('worker:attempts') as done, failed or delayed for a retry
+    FINISH_SCRIPT = """
+        if redis.call('HGET', KEYS[1], ARGV[1]) ~= ARGV[2] then return 0 end
+        redis.call('HDEL', KEYS[1], ARGV[1])
+        if redis.call('ZREM', KEYS[2], ARGV[1]) == 0 then
+            -- the lease expired and the unit was requeued, but nobody leased it again yet
+            redis.call('LREM', KEYS[3], 0, ARGV[1])
+        end
+        if ARGV[3] == 'done' then
+            redis.call('HDEL', KEYS[5], ARGV[1])
+            redis.call('SADD', KEYS[4], ARGV[1])
+        elseif ARGV[3] == 'failed' then
+            redis.call('HSET', KEYS[5], ARGV[1], ARGV[4])
+        else
+            redis.call('ZADD', KEYS[6], ARGV[4], ARGV[1])
+        end
+        return 1
+    """
+
+    def __init__(self, client, name='crawl_queue', **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.name = name
+
+    def _key(self, suffix):
+        return f"{self.name}:{suffix}"
+
+    def put(self, payloads):
+        # one round trip for the whole batch, each payload is queued atomically
+        pipeline = self.client.pipeline(transaction=False)
+        for payload in payloads:
+            pipeline.eval(self.PUT_SCRIPT, 4, self._key('keys'), self._key('next_id'), self._key('payloads'),
+                          self._key('pending'), unit_key(payload), json.dumps(payload, ensure_ascii=False))
+        return sum(pipeline.execute())
+
+    def lease(self, worker_id):
+        now = time.time()
+        self.client.eval(self.REQUEUE_SCRIPT, 2, self._key('leases'), self._key('pending'), now)
+        self.client.eval(self.REQUEUE_SCRIPT, 2, self._key('delayed'), self._key('pending'), now)
+        leased = self.client.eval(self.LEASE_SCRIPT, 6, self._key('pending'), self._key('leases'),
+                                  self._key('attempts'), self._key('failed'), self._key('owners'),
+                                  self._key('payloads'), now + self.visibility_timeout, self.max_attempts, worker_id)
+        if not leased:
+            return None
+        unit_id, attempts, payload = leased
+        return WorkUnit(int(unit_id), json.loads(payload), int(attempts), worker_id)
+
+    def _finish(self, unit, action, value=''):
+        return bool(self.client.eval(self.FINISH_SCRIPT, 6, self._key('owners'), self._key('leases'),
+                                     self._key('pending'), self._key('done'), self._key('failed'),
+                                     self._key('delayed'), unit.id, f"{unit.worker}:{unit.attempts}", action, value))
+
+    def complete(self, unit):
+        return self._finish(unit, 'done')
+
+    def fail(self, unit, error):
+        if unit.attempts >= self.max_attempts:
+            self._finish(unit, 'failed', str(error))
+            return False
+        return self._finish(unit, 'retry', time.time() + self.retry_delay * unit.attempts)
+
+    def stats(self):
+        return {
+            'pending': self.client.llen(self._key('pending')) + self.client.zcard(self._key('delayed')),
+            'leased': self.client.zcard(self._key('leases')),
+            'done': self.client.scard(self._key('done')),
+            'failed': self.client.hlen(self._key('failed')),
+        }
+
+    def failed_units(self):
+        errors = {int(unit_id): error.decode() if isinstance(error, bytes) else error
+                  for unit_id, error in self.client.hgetall(self._key('failed')).items()}
+        if not errors:
+            return []
+        unit_ids = sorted(errors)
+        payloads = self.client.hmget(self._key('payloads'), unit_ids)
+        attempts = self.client.hmget(self._key('attempts'), unit_ids)
+        # the owner is cleared when a lease ends, so the last worker is not known here
+        return [(WorkUnit(unit_id, json.loads(payload), int(attempt or 0), None), errors[unit_id])
+                for unit_id, payload, attempt in zip(unit_ids, payloads, attempts)]
+
+    def requeue_failed(self):
+        return self.client.eval(self.REQUEUE_FAILED_SCRIPT, 4, self._key('failed'), self._key('attempts'),
+                                self._key('owners'), self._key('pending'))
+
+
+def open_queue(url, **kwargs):
+    """Open a queue from 'redis://host:port/db' or a SQLite file path"""
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        import redis
+        return RedisWorkQueue(redis.Redis.from_url(url), **kwargs)
+    return SQLiteWorkQueue(url, **kwargs)